@@ -0,0 +1,163 @@
+import bisect
+import math
+import threading
+
+# Indicadores que disparam pela distância (<= 1%) independentemente do limite
+NEAR_INDICATORS = ("support", "resistance")
+NEAR_DISTANCE = 1
+
+# Condições aceitas por indicador; "near" só faz sentido para suporte e resistência,
+# cujos valores são distâncias percentuais até o nível
+ALERT_CONDITIONS = {
+    "price": ("above", "below"),
+    "rsi": ("above", "below"),
+    "volatility": ("above", "below"),
+    "bollinger": ("above", "below"),
+    "support": ("near",),
+    "resistance": ("near",),
+}
+
+
+def is_valid_alert(indicator, condition):
+    """Combinação de indicador e condição que o índice sabe avaliar"""
+    return isinstance(indicator, str) and condition in ALERT_CONDITIONS.get(indicator, ())
+
+
+def alert_value_key(alert):
+    """Nome do valor da análise comparado com o limite do alerta"""
+    if alert["indicator"] == "bollinger":
+        return "bollinger_above" if alert["condition"] == "above" else "bollinger_below"
+    return alert["indicator"]
+
+
+def _index_key(alert):
+    # Suporte e resistência sempre disparam pela distância, qualquer que seja a
+    # condição gravada; para os demais indicadores "near" não é avaliado
+    if alert["indicator"] in NEAR_INDICATORS:
+        return (alert["crypto_id"], alert_value_key(alert), "near")
+    if alert["condition"] in ("above", "below"):
+        return (alert["crypto_id"], alert_value_key(alert), alert["condition"])
+    return None
+
+
+class _ThresholdGroup:
+    """Limites ordenados de um (crypto_id, valor, condição) com os ids paralelos"""
+
+    __slots__ = ('thresholds', 'alert_ids')
+
+    def __init__(self):
+        self.thresholds = []
+        self.alert_ids = []
+
+    def add(self, threshold, alert_id):
+        position = bisect.bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(position, threshold)
+        self.alert_ids.insert(position, alert_id)
+
+    def remove(self, threshold, alert_id):
+        position = bisect.bisect_left(self.thresholds, threshold)
+        while position < len(self.thresholds) and self.thresholds[position] == threshold:
+            if self.alert_ids[position] == alert_id:
+                del self.thresholds[position]
+                del self.alert_ids[position]
+                return
+            position += 1
+
+
+class AlertIndex:
+    """Índice dos alertas pendentes para busca dos disparados por faixa de limites.
+
+    Um novo valor encontra todos os alertas "above" com limite menor (e "below"
+    com limite maior) por busca binária, sem percorrer os demais alertas.
+    """
+
+    def __init__(self):
+        self._groups = {}
+        self._alerts = {}
+        self._coin_counts = {}
+        self._lock = threading.Lock()
+
+    def load(self, alerts):
+        with self._lock:
+            self._groups.clear()
+            self._alerts.clear()
+            self._coin_counts.clear()
+            for alert in alerts:
+                self._add(alert)
+
+    def add(self, alert):
+        with self._lock:
+            self._remove(alert["id"])
+            self._add(alert)
+
+    def remove(self, alert_id):
+        with self._lock:
+            self._remove(alert_id)
+
+    def _add(self, alert):
+        key = _index_key(alert)
+        if key is None:
+            return
+        alert = dict(alert, threshold=float(alert["threshold"]))
+        self._groups.setdefault(key, _ThresholdGroup()).add(alert["threshold"], alert["id"])
+        self._alerts[alert["id"]] = alert
+        self._coin_counts[alert["crypto_id"]] = self._coin_counts.get(alert["crypto_id"], 0) + 1
+
+    def _remove(self, alert_id):
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return
+        key = _index_key(alert)
+        group = self._groups[key]
+        group.remove(alert["threshold"], alert_id)
+        if not group.thresholds:
+            del self._groups[key]
+
+        crypto_id = alert["crypto_id"]
+        self._coin_counts[crypto_id] -= 1
+        if not self._coin_counts[crypto_id]:
+            del self._coin_counts[crypto_id]
+
+    def coins(self):
+        """Moedas com pelo menos um alerta pendente"""
+        with self._lock:
+            return list(self._coin_counts)
+
+    def value_names(self, crypto_id):
+        """Valores da análise necessários para avaliar os alertas da moeda"""
+        with self._lock:
+            return {key[1] for key in self._groups if key[0] == crypto_id}
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def match(self, crypto_id, values):
+        """Alertas da moeda disparados pelos valores atuais.
+
+        Retorna pares (alerta, valor a registrar): o preço atual para alertas de
+        preço e o limite configurado para os demais.
+        """
+        triggered = []
+        with self._lock:
+            for name, value in values.items():
+                if value is None or math.isnan(value):
+                    continue
+
+                matched = []
+                group = self._groups.get((crypto_id, name, "above"))
+                if group:
+                    # value > limite: todos os limites estritamente menores
+                    matched.extend(group.alert_ids[:bisect.bisect_left(group.thresholds, value)])
+                group = self._groups.get((crypto_id, name, "below"))
+                if group:
+                    # value < limite: todos os limites estritamente maiores
+                    matched.extend(group.alert_ids[bisect.bisect_right(group.thresholds, value):])
+                group = self._groups.get((crypto_id, name, "near"))
+                if group and value <= NEAR_DISTANCE:
+                    matched.extend(group.alert_ids)
+
+                for alert_id in matched:
+                    alert = self._alerts[alert_id]
+                    value_to_show = value if alert["indicator"] == "price" else alert["threshold"]
+                    triggered.append((alert, value_to_show))
+        return triggered
@@ -1,16 +1,39 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import requests
-import sqlite3
 from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
 import time
-from flask_mail import Mail, Message
+from flask_mail import Mail
 from flask_cors import CORS
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from functools import cached_property
 import logging
+import atexit
 from dotenv import load_dotenv
 import numpy as np
 
+from backtesting import (WARMUP_PERIODS, expand_param_grid, resolve_strategy_params, run_backtest_grid,
+                         walk_forward)
+from batch_backtest import run_batch_backtest, run_batch_from_series
+from indicators import PRICE_CHANGE_PERIODS, cluster_levels, find_pivots, lookback_indices
+from market_cache import AnalysisSnapshotCache, MarketDataCache, data_version
+from storage import Database, WriteBehindBuffer
+from price_retention import PriceRetention
+from alert_index import AlertIndex, is_valid_alert
+from notifications import EmailDispatcher
+from price_events import AdaptivePollScheduler, PriceEventBus, drain_latest
+from streaming_indicators import IndicatorStates
+from market_client import CoinGeckoClient
+from market_overview import market_overview
+from correlation import CorrelationEngines
+from price_encoding import VALUE_DTYPES, downsample, encode_binary, encode_columnar, price_arrays
+from serialization import FastJSONProvider, finalize_response, not_modified, version_etag
+from rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimitTimeout, TokenBucketLimiter
+from price_archive import PriceArchive
+from candle_store import (INTERVAL_MS, candle_database, get_sync_state, init_candle_store, interval_for_days,
+                          load_candles, save_full_window, save_tail)
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
@@ -27,6 +50,7 @@ logger = logging.getLogger(__name__)
 
 # Inicializar o aplicativo Flask
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # Configurar CORS
 CORS(app, 
@@ -46,21 +70,35 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     return response
 
+# ETag, 304 e compressão gzip/brotli das respostas
+@app.after_request
+def compress_response(response):
+    return finalize_response(request, response)
+
 # Configurações de e-mail para notificações
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
 app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 
 mail = Mail(app)
 
-# Base URL para a API CoinGecko
-COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
+# Envio de e-mails em segundo plano, agrupando alertas do mesmo destinatário
+email_dispatcher = EmailDispatcher(app, mail, coalesce_window=int(os.getenv('MAIL_COALESCE_WINDOW', 5)))
+
+# Base URL para a API CoinGecko (pode apontar para um servidor local em testes)
+COINGECKO_API_URL = os.getenv("COINGECKO_API_URL", "https://api.coingecko.com/api/v3")
 
 # Cache para dados da API
-cache = {}
 CACHE_DURATION = 60  # segundos
+CACHE_MAX_ENTRIES = 256
+market_cache = MarketDataCache(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_DURATION)
+
+# Análises prontas por (moeda, dias), recalculadas só quando os dados mudam
+analysis_cache = AnalysisSnapshotCache()
+# Períodos mantidos aquecidos em segundo plano para todas as moedas
+ANALYSIS_WARM_DAYS = [int(days) for days in os.getenv('ANALYSIS_WARM_DAYS', '30').split(',') if days.strip()]
 
 # Lista de criptomoedas suportadas
 SUPPORTED_CRYPTOCURRENCIES = {
@@ -83,155 +121,213 @@ SUPPORTED_CRYPTOCURRENCIES = {
 
 # Configurações de rate limiting
 RATE_LIMIT_DELAY = 1.5  # segundos entre requisições
-last_request_time = 0
+rate_limiter = TokenBucketLimiter(rate=1 / RATE_LIMIT_DELAY, capacity=1)
+
+# Tempo máximo que cada prioridade aguarda admissão antes de desistir
+MAX_ADMISSION_WAIT = {
+    PRIORITY_INTERACTIVE: 5,
+    PRIORITY_BACKGROUND: 60
+}
+# Acima desta espera estimada, requisições servem o cache expirado
+STALE_SERVE_THRESHOLD = 1.0  # segundos
+
+# Alertas pendentes indexados por (moeda, indicador, condição)
+alert_index = AlertIndex()
+
+# Atualizações de preço publicadas pela ingestão e consumidas pelo monitor
+price_events = PriceEventBus()
+poll_scheduler = AdaptivePollScheduler()
+
+# Indicadores incrementais por moeda, avançados a cada barra fechada pelos ticks do
+# barramento; iniciados e agrupados na mesma série (e barra) da análise dos alertas
+ALERT_ANALYSIS_DAYS = 1
+indicator_states = IndicatorStates(bar_seconds=INTERVAL_MS[interval_for_days(ALERT_ANALYSIS_DAYS)] // 1000)
+INDICATOR_STATE_PATH = os.getenv('INDICATOR_STATE_PATH', 'indicator_state.json')
+# Valores de alerta sempre calculados pelo estado incremental a cada tick; os
+# demais (exceto o preço, que vem do próprio tick) vêm da análise completa
+STREAMING_ALERT_VALUES = {"rsi", "bollinger_above", "bollinger_below"}
+POLL_ERROR_DELAY = 30  # segundos
+
+# Correlações móveis entre moedas, uma por (moedas, intervalo, janela) consultada,
+# atualizadas pelos mesmos ticks; o poller também consulta as moedas delas
+correlation_engines = CorrelationEngines()
+CORRELATION_DEFAULT_WINDOW = int(os.getenv('CORRELATION_DEFAULT_WINDOW', 168))
+CORRELATION_MAX_WINDOW = 2000
+
+# Cliente HTTP compartilhado e threads para buscas de várias moedas
+market_client = CoinGeckoClient(COINGECKO_API_URL, rate_limiter, admission_timeouts=MAX_ADMISSION_WAIT)
+market_executor = ThreadPoolExecutor(max_workers=len(SUPPORTED_CRYPTOCURRENCIES), thread_name_prefix="market")
+
+# Conexões reaproveitadas em modo WAL; close() ou o fim do bloco with devolve a conexão ao pool
+DATABASE_PATH = "crypto_smart_trader.db"
+database = Database(DATABASE_PATH)
+
+# Histórico de mercado persiste entre execuções; o esquema é criado já na importação
+# para que load_market_data funcione mesmo quando o app não é iniciado por __main__
+init_candle_store()
 
 def get_db_connection():
-    conn = sqlite3.connect("crypto_smart_trader.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+    return database.connect()
+
+# Preços salvos no histórico passam por um buffer gravado em lote
+price_buffer = WriteBehindBuffer(
+    database,
+    '''INSERT INTO price_history (crypto_id, price, timestamp) VALUES (?, ?, ?)''',
+    batch_size=500,
+    flush_interval=0.5
+)
+
+# Ticks consolidados em candles de 1m/1h/1d; ticks brutos mantidos por poucos dias
+PRICE_RAW_RETENTION_DAYS = int(os.getenv('PRICE_RAW_RETENTION_DAYS', 2))
+PRICE_MAINTENANCE_INTERVAL = 60  # segundos
+price_retention = PriceRetention(database, tier_database=candle_database,
+                                 raw_retention_days=PRICE_RAW_RETENTION_DAYS)
+
+# Séries longas exportadas do armazenamento local para arquivos colunares (memmap)
+price_archive = PriceArchive()
+
+# Processos usados pelo backtest em lote (padrão: número de CPUs)
+BATCH_BACKTEST_WORKERS = int(os.getenv('BATCH_BACKTEST_WORKERS', 0)) or None
 
 def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Criando tabela de alertas com coluna de status
-    cursor.execute('''CREATE TABLE IF NOT EXISTS alerts (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        crypto_id TEXT NOT NULL,
-                        indicator TEXT NOT NULL,
-                        threshold REAL NOT NULL,
-                        condition TEXT NOT NULL,
-                        description TEXT,
-                        triggered_value REAL,
-                        status TEXT DEFAULT 'active',
-                        notification_sent BOOLEAN DEFAULT 0,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )''')
-
-    # Criando tabela de histórico de preços
-    cursor.execute('''CREATE TABLE IF NOT EXISTS price_history (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        crypto_id TEXT NOT NULL,
-                        price REAL NOT NULL,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )''')
-
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        # Criando tabela de alertas com coluna de status
+        cursor.execute('''CREATE TABLE IF NOT EXISTS alerts (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            crypto_id TEXT NOT NULL,
+                            indicator TEXT NOT NULL,
+                            threshold REAL NOT NULL,
+                            condition TEXT NOT NULL,
+                            description TEXT,
+                            triggered_value REAL,
+                            status TEXT DEFAULT 'active',
+                            notification_sent BOOLEAN DEFAULT 0,
+                            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                        )''')
+
+        # Criando tabela de histórico de preços
+        cursor.execute('''CREATE TABLE IF NOT EXISTS price_history (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            crypto_id TEXT NOT NULL,
+                            price REAL NOT NULL,
+                            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                        )''')
+
+        # Índices para o monitor de alertas e consultas de histórico
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_alerts_status_crypto
+                          ON alerts (status, crypto_id)''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_price_history_crypto_timestamp
+                          ON price_history (crypto_id, timestamp)''')
+
+    # Tabelas agregadas do histórico de preços
+    price_retention.init_schema()
 
 def validate_crypto_id(crypto_id):
     return crypto_id in SUPPORTED_CRYPTOCURRENCIES
 
-def fetch_market_data(crypto_id, days):
-    global last_request_time
-    if not validate_crypto_id(crypto_id):
-        raise ValueError(f"Criptomoeda não suportada: {crypto_id}")
+def sync_market_data(crypto_id, days, priority=PRIORITY_INTERACTIVE, interval=None):
+    """Sincroniza o armazenamento local baixando apenas o trecho que falta"""
+    interval = interval or interval_for_days(days)
+    now_ms = int(time.time() * 1000)
+    since_ms = now_ms - days * 24 * 3600 * 1000
+    covered_from, last_ts = get_sync_state(crypto_id, interval)
 
-    cache_key = f"{crypto_id}_{days}"
-    current_time = time.time()
+    if covered_from is None or last_ts is None or covered_from > since_ms:
+        # Janela ainda não armazenada: baixar o período completo
+        data = market_client.market_chart(crypto_id, days, interval, priority)
 
-    # Verificar cache
-    if cache_key in cache and current_time - cache[cache_key]["timestamp"] < CACHE_DURATION:
-        return cache[cache_key]["data"]
+        # Validar dados recebidos
+        if not data or 'prices' not in data or not data['prices']:
+            raise ValueError("Dados inválidos recebidos da API")
 
-    # Rate limiting mais conservador
-    time_since_last_request = current_time - last_request_time
-    if time_since_last_request < RATE_LIMIT_DELAY:
-        sleep_time = RATE_LIMIT_DELAY - time_since_last_request + 0.5  # Adiciona 0.5s de margem
-        time.sleep(sleep_time)
+        save_full_window(crypto_id, interval, data, since_ms)
+    else:
+        # Apenas o trecho após o último timestamp armazenado
+        data = market_client.market_chart_range(crypto_id, last_ts // 1000, now_ms // 1000, priority)
+        if data and data.get('prices'):
+            save_tail(crypto_id, interval, data)
 
-    # Tentar fazer a requisição com retry e backoff exponencial
-    max_retries = 5  # Aumentado de 3 para 5
-    retry_delay = 2
-    last_error = None
-    
-    for attempt in range(max_retries):
+    if data and data.get('prices'):
+        last_ts, last_price = data['prices'][-1]
+        # Avisar o monitor de alertas se o preço mudou
+        price_events.publish(crypto_id, last_price, last_ts / 1000)
+
+        # Salvar preço atual no histórico
         try:
-            url = f"{COINGECKO_API_URL}/coins/{crypto_id}/market_chart"
-            params = {
-                "vs_currency": "usd",
-                "days": days,
-                "interval": "daily" if days > 1 else "hourly"  # Otimiza os dados
-            }
-            
-            last_request_time = time.time()
-            response = requests.get(url, params=params, timeout=15)  # Aumentado timeout
-            
-            if response.status_code == 429:  # Too Many Requests
-                retry_after = int(response.headers.get('Retry-After', retry_delay))
-                logger.warning(f"Rate limit atingido, aguardando {retry_after} segundos...")
-                time.sleep(retry_after)
-                continue
-                
-            response.raise_for_status()
-            data = response.json()
-            
-            # Validar dados recebidos
-            if not data or 'prices' not in data or not data['prices']:
-                raise ValueError("Dados inválidos recebidos da API")
-                
-            cache[cache_key] = {"data": data, "timestamp": current_time}
-            
-            # Salvar preço atual no histórico
-            try:
-                save_current_price(crypto_id, data['prices'][-1][1])
-            except Exception as e:
-                logger.error(f"Erro ao salvar preço no histórico: {e}")
-            
+            save_current_price(crypto_id, last_price)
+        except Exception as e:
+            logger.error(f"Erro ao salvar preço no histórico: {e}")
+
+    return since_ms
+
+def load_market_data(crypto_id, days, priority=PRIORITY_INTERACTIVE, interval=None):
+    interval = interval or interval_for_days(days)
+    try:
+        since_ms = sync_market_data(crypto_id, days, priority, interval)
+    except (requests.exceptions.RequestException, RateLimitTimeout, ValueError) as e:
+        logger.error(f"Erro ao sincronizar dados do mercado: {e}")
+
+        # Se houver dados armazenados, mesmo que antigos, use-os em caso de erro
+        since_ms = int(time.time() * 1000) - days * 24 * 3600 * 1000
+        data = load_candles(crypto_id, interval, since_ms)
+        if data['prices']:
+            logger.warning("Usando dados armazenados devido a erro na API")
             return data
-            
-        except requests.exceptions.RequestException as e:
-            last_error = e
-            if attempt < max_retries - 1:
-                sleep_time = retry_delay * (2 ** attempt)  # Backoff exponencial
-                logger.warning(f"Tentativa {attempt + 1} falhou, aguardando {sleep_time}s...")
-                time.sleep(sleep_time)
-                continue
-            
-            # Se tiver dados em cache, mesmo que antigos, use-os em caso de erro
-            if cache_key in cache and (time.time() - cache[cache_key]["timestamp"] < CACHE_DURATION):
-                logger.warning("Usando dados em cache devido a erro na API")
-                return cache[cache_key]["data"]
-            else:
-                logger.error("Dados em cache não disponíveis ou desatualizados.")
-                raise ValueError("Não foi possível obter dados do mercado. Tente novamente mais tarde.")
+        raise ValueError("Não foi possível obter dados do mercado. Tente novamente mais tarde.")
+
+    data = load_candles(crypto_id, interval, since_ms)
+    if not data['prices']:
+        raise ValueError("Dados inválidos recebidos da API")
+    return data
+
+def fetch_market_data(crypto_id, days, priority=PRIORITY_INTERACTIVE, interval=None):
+    """Janela de market_chart da moeda; interval (padrão: pelo número de dias) fixa a granularidade"""
+    if not validate_crypto_id(crypto_id):
+        raise ValueError(f"Criptomoeda não suportada: {crypto_id}")
+
+    # Falhas simultâneas na mesma janela compartilham uma única sincronização;
+    # se a admissão demorar, a janela expirada é servida em vez de bloquear
+    return market_cache.get_or_load(
+        crypto_id, days,
+        lambda: load_market_data(crypto_id, days, priority, interval),
+        stale_if=lambda: rate_limiter.estimate_wait(priority) > STALE_SERVE_THRESHOLD,
+        interval=interval
+    )
+
+def fetch_market_data_many(crypto_ids, days, priority=PRIORITY_INTERACTIVE, interval=None):
+    """Busca as séries de várias moedas em paralelo, sob o rate limit compartilhado"""
+    futures = {
+        crypto_id: market_executor.submit(fetch_market_data, crypto_id, days, priority, interval)
+        for crypto_id in crypto_ids
+    }
+    results = {}
+    for crypto_id, future in futures.items():
+        try:
+            results[crypto_id] = future.result()
+        except Exception as e:
+            logger.error(f"Erro ao buscar dados de {crypto_id}: {e}")
+            results[crypto_id] = None
+    return results
+
+def fetch_current_prices(crypto_ids, priority=PRIORITY_INTERACTIVE):
+    """Preço atual de várias moedas com uma única chamada ao endpoint /simple/price"""
+    invalid = [crypto_id for crypto_id in crypto_ids if not validate_crypto_id(crypto_id)]
+    if invalid:
+        raise ValueError(f"Criptomoeda não suportada: {', '.join(invalid)}")
+    return market_client.simple_price(crypto_ids, priority)
 
 def save_current_price(crypto_id, price):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''INSERT INTO price_history (crypto_id, price)
-                     VALUES (?, ?)''', (crypto_id, price))
-    try:
-        conn.commit()
-    except Exception as e:
-        logger.error(f"Erro ao realizar commit: {e}")
-    finally:
-        conn.close()
+    # Gravação em lote pela thread do buffer, fora do caminho da requisição
+    timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    price_buffer.append((crypto_id, price, timestamp))
 
 def send_alert_email(alert, current_value):
-    try:
-        subject = f"Alerta de Cripto: {alert['crypto_id'].upper()}"
-        body = f"""
-        Seu alerta foi acionado!
-        
-        Criptomoeda: {alert['crypto_id'].upper()}
-        Indicador: {alert['indicator']}
-        Condição: {alert['condition']}
-        Limite: {alert['threshold']}
-        Valor Atual: {current_value}
-        
-        Data/Hora: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
-        """
-        
-        msg = Message(subject,
-                     sender=app.config['MAIL_USERNAME'],
-                     recipients=[os.getenv('ALERT_EMAIL')])
-        msg.body = body
-        mail.send(msg)
-        logger.info(f"E-mail de alerta enviado para {alert['crypto_id']}")
-    except Exception as e:
-        logger.error(f"Erro ao enviar e-mail de alerta: {e}")
+    # Apenas agenda o envio; o dispatcher cuida da conexão SMTP e dos reenvios
+    if email_dispatcher.enqueue(os.getenv('ALERT_EMAIL'), alert, current_value):
+        logger.info(f"E-mail de alerta agendado para {alert['crypto_id']}")
 
 def calculate_rsi(prices, period=14):
     deltas = np.diff(prices)
@@ -285,27 +381,19 @@ def analyze_trend(prices, period=14):
     else:
         return "Lateral"
 
-def calculate_price_changes(prices, timestamps):
+def calculate_price_changes(prices, timestamps, periods=PRICE_CHANGE_PERIODS):
+    """Variação percentual do preço atual em cada período; timestamps em ms (int64)"""
     current_price = prices[-1]
-    current_time = timestamps[-1]
+    # Índices de todos os períodos em uma única busca binária
+    indices = lookback_indices(timestamps, list(periods.values()), at=timestamps[-1])
     
     changes = {}
-    periods = {
-        '1h': timedelta(hours=1),
-        '24h': timedelta(hours=24),
-        '7d': timedelta(days=7),
-        '30d': timedelta(days=30)
-    }
-    
-    for period_name, period_delta in periods.items():
-        target_time = current_time - period_delta
-        for i in range(len(timestamps)-1, -1, -1):
-            if timestamps[i] <= target_time:
-                price_change = ((current_price - prices[i]) / prices[i]) * 100
-                changes[period_name] = round(price_change, 2)
-                break
-            if i == 0:
-                changes[period_name] = None
+    for period_name, index in zip(periods, indices):
+        if index < 0:
+            changes[period_name] = None
+        else:
+            price_change = ((current_price - prices[index]) / prices[index]) * 100
+            changes[period_name] = round(float(price_change), 2)
     
     return changes
 
@@ -338,41 +426,117 @@ def calculate_fibonacci_levels(prices):
     }
     return levels
 
-def identify_support_resistance(prices, window=20):
-    supports = []
-    resistances = []
+def identify_support_resistance(prices, window=20, pivots=None):
+    if pivots is None:
+        pivots = find_pivots(prices, window)
+    supports = pivots['support_levels']
+    resistances = pivots['resistance_levels']
     
-    for i in range(window, len(prices)-window):
-        if all(prices[i] <= prices[j] for j in range(i-window, i+window)):
-            supports.append(prices[i])
-        if all(prices[i] >= prices[j] for j in range(i-window, i+window)):
-            resistances.append(prices[i])
-    
-    if supports:
+    if len(supports):
         support = np.mean(supports[-3:]) if len(supports) >= 3 else supports[-1]
     else:
         support = min(prices)
         
-    if resistances:
+    if len(resistances):
         resistance = np.mean(resistances[-3:]) if len(resistances) >= 3 else resistances[-1]
     else:
         resistance = max(prices)
         
     return support, resistance
 
+def identify_support_resistance_zones(context, tolerance=0.01):
+    """Agrupa todos os pivôs da série do contexto em zonas de suporte e resistência"""
+    pivots = context.pivots
+    return {
+        'support': cluster_levels(pivots['support_levels'], pivots['support_indices'], tolerance),
+        'resistance': cluster_levels(pivots['resistance_levels'], pivots['resistance_indices'], tolerance)
+    }
+
 def calculate_volatility(prices, window=14):
     returns = np.diff(np.log(prices))
     volatility = np.std(returns[-window:]) * np.sqrt(252) * 100  # Anualizada em %
     return volatility
 
-def calculate_market_strength(prices, volumes):
+class AnalysisContext:
+    """Indicadores de uma série calculados sob demanda e no máximo uma vez.
+
+    Compartilhado pelas funções de uma mesma análise para que RSI, MACD,
+    estocástico e médias não sejam recalculados por cada uma delas.
+    """
+
+    def __init__(self, prices, volumes=None):
+        self.prices = prices
+        self.volumes = volumes if volumes is not None else []
+        self._sma = {}
+        self._ema = {}
+
+    @cached_property
+    def rsi(self):
+        return calculate_rsi(self.prices)
+
+    @cached_property
+    def macd(self):
+        return calculate_macd(self.prices)
+
+    @cached_property
+    def stochastic(self):
+        return calculate_stochastic(self.prices)
+
+    @cached_property
+    def volatility(self):
+        return calculate_volatility(self.prices)
+
+    @cached_property
+    def bollinger_bands(self):
+        return calculate_bollinger_bands(self.prices)
+
+    @cached_property
+    def pivots(self):
+        # Compartilhados pelo suporte/resistência e pelas zonas
+        return find_pivots(self.prices)
+
+    @cached_property
+    def support_resistance(self):
+        return identify_support_resistance(self.prices, pivots=self.pivots)
+
+    @cached_property
+    def recent_support_resistance(self):
+        # Suporte/resistência dos últimos 20 períodos, usados pelos padrões
+        return identify_support_resistance(self.prices[-20:])
+
+    def sma(self, period):
+        """Série completa da SMA"""
+        if period not in self._sma:
+            self._sma[period] = calculate_sma(self.prices, period)
+        return self._sma[period]
+
+    def ema(self, period):
+        """Série completa da EMA"""
+        if period not in self._ema:
+            self._ema[period] = calculate_ema(self.prices, period)
+        return self._ema[period]
+
+    def previous_sma(self, period):
+        """SMA da barra anterior, igual a calculate_sma(prices[:-1], period)[-1]"""
+        series = self.sma(period)
+        # Com um único valor na série, prices[:-1] é menor que o período e o
+        # resultado de np.convolve não é uma fatia da série completa
+        return series[-2] if len(series) >= 2 else calculate_sma(self.prices[:-1], period)[-1]
+
+    def previous_ema(self, period):
+        """EMA da barra anterior, igual a calculate_ema(prices[:-1], period)[-1]"""
+        series = self.ema(period)
+        return series[-2] if len(series) >= 2 else calculate_ema(self.prices[:-1], period)[-1]
+
+def calculate_market_strength(prices, volumes, context=None):
     """Calcula um índice de força do mercado de 0 a 100"""
+    context = context or AnalysisContext(prices, volumes)
     try:
         # Calcular indicadores
-        rsi = calculate_rsi(prices)
-        macd_line, signal_line = calculate_macd(prices)
-        volatility = calculate_volatility(prices)
-        stoch = calculate_stochastic(prices)
+        rsi = context.rsi
+        macd_line, signal_line = context.macd
+        volatility = context.volatility
+        stoch = context.stochastic
         
         # Volume médio dos últimos 7 dias vs 30 dias
         vol_ratio = np.mean(volumes[-7:]) / np.mean(volumes[-30:])
@@ -404,16 +568,14 @@ def calculate_market_strength(prices, volumes):
         logger.error(f"Erro ao calcular força do mercado: {e}")
         return None
 
-def identify_price_patterns(prices, timestamps):
+def identify_price_patterns(prices, timestamps, context=None):
     """Identifica padrões de preço comuns"""
+    context = context or AnalysisContext(prices)
     patterns = []
     
     try:
-        # Últimos 20 períodos
-        recent_prices = prices[-20:]
-        
-        # Padrão de Suporte/Resistência
-        support, resistance = identify_support_resistance(recent_prices)
+        # Padrão de Suporte/Resistência dos últimos 20 períodos
+        support, resistance = context.recent_support_resistance
         current_price = prices[-1]
         
         if abs(current_price - support) / support < 0.02:
@@ -431,7 +593,7 @@ def identify_price_patterns(prices, timestamps):
             })
             
         # Padrão de Reversão
-        rsi = calculate_rsi(prices)
+        rsi = context.rsi
         if rsi > 70 and current_price < prices[-2]:
             patterns.append({
                 'name': 'Possível Reversão de Alta',
@@ -447,10 +609,10 @@ def identify_price_patterns(prices, timestamps):
             
         # Cruzamento de Médias
         if len(prices) >= 50:
-            sma_20 = calculate_sma(prices, 20)[-1]
-            ema_50 = calculate_ema(prices, 50)[-1]
-            sma_20_prev = calculate_sma(prices[:-1], 20)[-1]
-            ema_50_prev = calculate_ema(prices[:-1], 50)[-1]
+            sma_20 = context.sma(20)[-1]
+            ema_50 = context.ema(50)[-1]
+            sma_20_prev = context.previous_sma(20)
+            ema_50_prev = context.previous_ema(50)
             
             if sma_20_prev < ema_50_prev and sma_20 > ema_50:
                 patterns.append({
@@ -470,13 +632,14 @@ def identify_price_patterns(prices, timestamps):
         logger.error(f"Erro ao identificar padrões: {e}")
         return []
 
-def generate_trading_recommendations(prices, volumes, patterns, market_strength):
+def generate_trading_recommendations(prices, volumes, patterns, market_strength, context=None):
     """Gera recomendações de trading baseadas na análise técnica"""
+    context = context or AnalysisContext(prices, volumes)
     try:
         current_price = prices[-1]
-        rsi = calculate_rsi(prices)
-        macd_line, signal_line = calculate_macd(prices)
-        stoch = calculate_stochastic(prices)
+        rsi = context.rsi
+        macd_line, signal_line = context.macd
+        stoch = context.stochastic
         
         recommendations = []
         
@@ -528,6 +691,131 @@ def generate_trading_recommendations(prices, volumes, patterns, market_strength)
         logger.error(f"Erro ao gerar recomendações: {e}")
         return []
 
+def analyze_crypto_data(crypto_id, market_data):
+    """Calcula a análise técnica completa a partir dos dados de mercado"""
+    timestamps, prices = price_arrays(market_data["prices"])
+    volumes = [vol[1] for vol in market_data.get("total_volumes", [])]
+    context = AnalysisContext(prices, volumes)
+    
+    current_price = prices[-1]
+    
+    # Cálculos protegidos
+    analysis_result = {
+        "crypto_id": crypto_id,
+        "symbol": SUPPORTED_CRYPTOCURRENCIES[crypto_id],
+        "current_price": float(current_price),
+        "prices": market_data["prices"],
+        "technical_indicators": {},
+        "market_analysis": {
+            "trend": "Indefinida",
+            "price_changes": {},
+            "avg_volume_7d": 0
+        }
+    }
+    
+    # Adiciona indicadores apenas se houver dados suficientes
+    if len(prices) >= 14:
+        rsi = context.rsi
+        analysis_result["technical_indicators"]["rsi"] = round(float(rsi), 2)
+    
+    if len(prices) >= 26:
+        macd_line, signal_line = context.macd
+        analysis_result["technical_indicators"]["macd"] = {
+            "line": round(float(macd_line), 8),
+            "signal": round(float(signal_line), 8)
+        }
+    
+    if len(prices) >= 20:
+        sma_20 = context.sma(20)[-1]
+        analysis_result["technical_indicators"]["sma_20"] = round(float(sma_20), 2)
+    
+    if len(prices) >= 50:
+        ema_50 = context.ema(50)[-1]
+        analysis_result["technical_indicators"]["ema_50"] = round(float(ema_50), 2)
+        
+        upper_band, middle_band, lower_band = context.bollinger_bands
+        analysis_result["technical_indicators"]["bollinger_bands"] = {
+            "upper": round(float(upper_band[-1]), 2),
+            "middle": round(float(middle_band[-1]), 2),
+            "lower": round(float(lower_band[-1]), 2)
+        }
+    
+    if len(prices) >= 14:
+        stochastic_k = context.stochastic
+        analysis_result["technical_indicators"]["stochastic"] = round(float(stochastic_k), 2)
+        
+        support, resistance = context.support_resistance
+        zones = identify_support_resistance_zones(context)
+        analysis_result["technical_indicators"]["support_resistance"] = {
+            "support": round(float(support), 2),
+            "resistance": round(float(resistance), 2),
+            "zones": {
+                side: [
+                    {
+                        "level": round(zone["level"], 2),
+                        "low": round(zone["low"], 2),
+                        "high": round(zone["high"], 2),
+                        "touches": zone["touches"]
+                    }
+                    for zone in side_zones
+                ]
+                for side, side_zones in zones.items()
+            }
+        }
+        
+        volatility = context.volatility
+        analysis_result["technical_indicators"]["volatility"] = round(float(volatility), 2)
+        
+        analysis_result["market_analysis"]["trend"] = analyze_trend(prices)
+        
+    analysis_result["market_analysis"]["price_changes"] = calculate_price_changes(prices, timestamps)
+    
+    if volumes:
+        analysis_result["market_analysis"]["avg_volume_7d"] = round(float(np.mean(volumes[-7:])), 2)
+    
+    if len(prices) >= 30:
+        fib_levels = calculate_fibonacci_levels(prices)
+        analysis_result["fibonacci_levels"] = {k: round(float(v), 2) for k, v in fib_levels.items()}
+    
+    # Adicionar força do mercado à análise
+    market_strength = calculate_market_strength(prices, volumes, context)
+    if market_strength:
+        analysis_result["market_strength"] = market_strength
+    
+    # Identificar padrões e gerar recomendações
+    patterns = identify_price_patterns(prices, timestamps, context)
+    recommendations = generate_trading_recommendations(prices, volumes, patterns, market_strength, context)
+    
+    analysis_result["patterns"] = patterns
+    analysis_result["recommendations"] = recommendations
+    
+    return analysis_result
+
+def get_analysis(crypto_id, days, market_data):
+    """Análise da versão atual dos dados, servida do cache de snapshots quando possível.
+
+    Retorna (análise, idade do snapshot em segundos).
+    """
+    result, computed_at = analysis_cache.get_or_compute(
+        crypto_id, days, data_version(market_data),
+        lambda: analyze_crypto_data(crypto_id, market_data)
+    )
+    return result, time.time() - computed_at
+
+def warm_analysis_snapshots():
+    """Mantém as análises das moedas suportadas calculadas antes da primeira requisição"""
+    while True:
+        for days in ANALYSIS_WARM_DAYS:
+            for crypto_id, market_data in fetch_market_data_many(
+                    SUPPORTED_CRYPTOCURRENCIES, days, PRIORITY_BACKGROUND).items():
+                if not market_data or not market_data.get('prices'):
+                    continue
+                try:
+                    get_analysis(crypto_id, days, market_data)
+                except Exception as e:
+                    logger.error(f"Erro ao pré-calcular análise de {crypto_id}: {e}")
+        time.sleep(CACHE_DURATION)
+
 @app.route("/analyze", methods=["GET"])
 def analyze_crypto():
     try:
@@ -548,89 +836,25 @@ def analyze_crypto():
         if not market_data or 'prices' not in market_data or not market_data['prices']:
             return jsonify({"error": "Dados de mercado inválidos"}), 503
 
+        points = request.args.get("points", type=int)
+        prices_format = request.args.get("prices_format", "json")
+        value_dtype = request.args.get("dtype", "float64")
+        if prices_format not in ("json", "columnar") or value_dtype not in VALUE_DTYPES:
+            return jsonify({"error": "Formato de preços inválido"}), 400
+
+        # A mesma versão dos dados com os mesmos parâmetros gera a mesma resposta
+        etag = version_etag("analyze", crypto_id, days, data_version(market_data), points, prices_format, value_dtype)
+        if not_modified(request, etag):
+            return Response(status=304, headers={"ETag": f'W/"{etag}"'})
+
         try:
-            prices = np.array([price[1] for price in market_data["prices"]])
-            timestamps = [datetime.fromtimestamp(price[0]/1000) for price in market_data["prices"]]
-            volumes = [vol[1] for vol in market_data.get("total_volumes", [])]
-            
-            current_price = prices[-1]
-            
-            # Cálculos protegidos
-            analysis_result = {
-                "crypto_id": crypto_id,
-                "symbol": SUPPORTED_CRYPTOCURRENCIES[crypto_id],
-                "current_price": float(current_price),
-                "prices": market_data["prices"],
-                "technical_indicators": {},
-                "market_analysis": {
-                    "trend": "Indefinida",
-                    "price_changes": {},
-                    "avg_volume_7d": 0
-                }
-            }
-            
-            # Adiciona indicadores apenas se houver dados suficientes
-            if len(prices) >= 14:
-                rsi = calculate_rsi(prices)
-                analysis_result["technical_indicators"]["rsi"] = round(float(rsi), 2)
-            
-            if len(prices) >= 26:
-                macd_line, signal_line = calculate_macd(prices)
-                analysis_result["technical_indicators"]["macd"] = {
-                    "line": round(float(macd_line), 8),
-                    "signal": round(float(signal_line), 8)
-                }
-            
-            if len(prices) >= 20:
-                sma_20 = calculate_sma(prices, 20)[-1]
-                analysis_result["technical_indicators"]["sma_20"] = round(float(sma_20), 2)
-            
-            if len(prices) >= 50:
-                ema_50 = calculate_ema(prices, 50)[-1]
-                analysis_result["technical_indicators"]["ema_50"] = round(float(ema_50), 2)
-                
-                upper_band, middle_band, lower_band = calculate_bollinger_bands(prices)
-                analysis_result["technical_indicators"]["bollinger_bands"] = {
-                    "upper": round(float(upper_band[-1]), 2),
-                    "middle": round(float(middle_band[-1]), 2),
-                    "lower": round(float(lower_band[-1]), 2)
-                }
-            
-            if len(prices) >= 14:
-                stochastic_k = calculate_stochastic(prices)
-                analysis_result["technical_indicators"]["stochastic"] = round(float(stochastic_k), 2)
-                
-                support, resistance = identify_support_resistance(prices)
-                analysis_result["technical_indicators"]["support_resistance"] = {
-                    "support": round(float(support), 2),
-                    "resistance": round(float(resistance), 2)
-                }
-                
-                volatility = calculate_volatility(prices)
-                analysis_result["technical_indicators"]["volatility"] = round(float(volatility), 2)
-                
-                analysis_result["market_analysis"]["trend"] = analyze_trend(prices)
-                
-            if volumes:
-                analysis_result["market_analysis"]["avg_volume_7d"] = round(float(np.mean(volumes[-7:])), 2)
-            
-            if len(prices) >= 30:
-                fib_levels = calculate_fibonacci_levels(prices)
-                analysis_result["fibonacci_levels"] = {k: round(float(v), 2) for k, v in fib_levels.items()}
-            
-            # Adicionar força do mercado à análise
-            market_strength = calculate_market_strength(prices, volumes)
-            if market_strength:
-                analysis_result["market_strength"] = market_strength
-            
-            # Identificar padrões e gerar recomendações
-            patterns = identify_price_patterns(prices, timestamps)
-            recommendations = generate_trading_recommendations(prices, volumes, patterns, market_strength)
-            
-            analysis_result["patterns"] = patterns
-            analysis_result["recommendations"] = recommendations
-            
-            return jsonify(analysis_result)
+            analysis_result, snapshot_age = get_analysis(crypto_id, days, market_data)
+            analysis_result = dict(analysis_result, snapshot_age=round(snapshot_age, 3))
+            if points or prices_format != "json":
+                analysis_result["prices"] = encode_prices(market_data["prices"], points, prices_format, value_dtype)
+            response = jsonify(analysis_result)
+            response.set_etag(etag, weak=True)
+            return response
             
         except Exception as e:
             logger.error(f"Erro ao calcular indicadores: {e}")
@@ -640,60 +864,184 @@ def analyze_crypto():
         logger.error(f"Erro na análise de criptomoeda: {e}")
         return jsonify({"error": "Erro interno do servidor"}), 500
 
+@app.route("/analyze/batch", methods=["GET"])
+def analyze_batch():
+    """Tendência, RSI, força do mercado e variações de preço de várias moedas em uma resposta"""
+    days = request.args.get("days", 30, type=int)
+    crypto_ids = request.args.get("crypto_ids")
+    crypto_ids = crypto_ids.split(",") if crypto_ids else list(SUPPORTED_CRYPTOCURRENCIES)
+
+    invalid = [crypto_id for crypto_id in crypto_ids if not validate_crypto_id(crypto_id)]
+    if invalid:
+        return jsonify({"error": f"Criptomoeda não suportada: {', '.join(invalid)}"}), 400
+
+    series = {
+        crypto_id: market_data
+        for crypto_id, market_data in fetch_market_data_many(crypto_ids, days).items()
+        if market_data and market_data.get('prices')
+    }
+    if not series:
+        return jsonify({"error": "Erro ao obter dados do mercado"}), 503
+
+    version = tuple((crypto_id, data_version(series[crypto_id])) for crypto_id in sorted(series))
+    etag = version_etag("analyze/batch", days, version)
+    if not_modified(request, etag):
+        return Response(status=304, headers={"ETag": f'W/"{etag}"'})
+
+    try:
+        # Uma única entrada no cache de snapshots para o conjunto de moedas pedido
+        overview, computed_at = analysis_cache.get_or_compute(
+            "batch:" + ",".join(sorted(series)), days, version,
+            lambda: market_overview(series, SUPPORTED_CRYPTOCURRENCIES)
+        )
+    except Exception as e:
+        logger.error(f"Erro ao calcular visão geral do mercado: {e}")
+        return jsonify({"error": "Erro ao calcular indicadores técnicos"}), 500
+
+    response = jsonify({
+        "period": f"{days} dias",
+        "coins": overview,
+        "unavailable": [crypto_id for crypto_id in crypto_ids if crypto_id not in series],
+        "snapshot_age": round(time.time() - computed_at, 3)
+    })
+    response.set_etag(etag, weak=True)
+    return response
+
+def encode_prices(prices, points=None, prices_format="json", value_dtype="float64"):
+    """Série de preços reduzida a `points` pontos (LTTB) no formato pedido"""
+    timestamps, values = downsample(*price_arrays(prices), points)
+    if prices_format == "columnar":
+        return encode_columnar(timestamps, values, value_dtype)
+    return [[int(ts), float(value)] for ts, value in zip(timestamps, values)]
+
+@app.route("/prices", methods=["GET"])
+def get_prices():
+    """Série de preços em formato compacto: JSON colunar ou binário (Accept: application/octet-stream)"""
+    crypto_id = request.args.get("crypto_id", "bitcoin")
+    days = request.args.get("days", 30, type=int)
+    points = request.args.get("points", type=int)
+    prices_format = request.args.get("prices_format", "columnar")
+    value_dtype = request.args.get("dtype", "float64")
+
+    if not validate_crypto_id(crypto_id):
+        return jsonify({"error": "Criptomoeda não suportada"}), 400
+    if prices_format not in ("json", "columnar") or value_dtype not in VALUE_DTYPES:
+        return jsonify({"error": "Formato de preços inválido"}), 400
+
+    try:
+        market_data = fetch_market_data(crypto_id, days)
+    except Exception as e:
+        logger.error(f"Erro ao buscar dados do mercado: {e}")
+        return jsonify({"error": "Erro ao obter dados do mercado"}), 503
+    if not market_data or not market_data.get('prices'):
+        return jsonify({"error": "Dados de mercado inválidos"}), 503
+
+    best = request.accept_mimetypes.best_match(["application/json", "application/octet-stream"])
+    etag = version_etag("prices", crypto_id, days, data_version(market_data), points, prices_format, value_dtype, best)
+    if not_modified(request, etag):
+        return Response(status=304, headers={"ETag": f'W/"{etag}"'})
+
+    if best == "application/octet-stream":
+        timestamps, values = downsample(*price_arrays(market_data["prices"]), points)
+        response = Response(encode_binary(timestamps, values, value_dtype), mimetype="application/octet-stream")
+    else:
+        response = jsonify({
+            "crypto_id": crypto_id,
+            "period": f"{days} dias",
+            "prices": encode_prices(market_data["prices"], points, prices_format, value_dtype)
+        })
+    response.set_etag(etag, weak=True)
+    response.vary.add("Accept")
+    return response
+
+@app.route("/history", methods=["GET"])
+def price_history():
+    crypto_id = request.args.get("crypto_id", "bitcoin")
+    days = request.args.get("days", 1, type=float)
+
+    if not validate_crypto_id(crypto_id):
+        return jsonify({"error": "Criptomoeda não suportada"}), 400
+    if days <= 0:
+        return jsonify({"error": "Período inválido"}), 400
+
+    try:
+        tier, rows = price_retention.load_history(crypto_id, days)
+    except Exception as e:
+        logger.error(f"Erro ao buscar histórico de preços: {e}")
+        return jsonify({"error": "Erro ao obter histórico de preços"}), 500
+
+    return jsonify({
+        "crypto_id": crypto_id,
+        "period": f"{days:g} dias",
+        "resolution": tier.name,
+        "candles": [
+            {"timestamp": bucket * 1000, "open": open_, "high": high, "low": low,
+             "close": close, "samples": samples}
+            for bucket, open_, high, low, close, samples in rows
+        ]
+    })
+
 @app.route("/alerts", methods=["GET", "POST"])
 def manage_alerts():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     if request.method == "GET":
-        cursor.execute("SELECT * FROM alerts WHERE status = 'active' ORDER BY created_at DESC")
-        alerts = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.execute("SELECT * FROM alerts WHERE status = 'active' ORDER BY created_at DESC")
+            alerts = [dict(row) for row in cursor.fetchall()]
         return jsonify(alerts)
 
-    elif request.method == "POST":
-        data = request.get_json()
-        required_fields = ["crypto_id", "indicator", "threshold", "condition"]
-        
-        if not all(field in data for field in required_fields):
-            conn.close()
-            return jsonify({"error": "Campos obrigatórios faltando"}), 400
+    # Validar o corpo antes de pegar uma conexão do pool
+    data = request.get_json()
+    required_fields = ["crypto_id", "indicator", "threshold", "condition"]
+    
+    if not isinstance(data, dict) or not all(field in data for field in required_fields):
+        return jsonify({"error": "Campos obrigatórios faltando"}), 400
 
-        if not validate_crypto_id(data["crypto_id"]):
-            conn.close()
-            return jsonify({"error": "Criptomoeda não suportada"}), 400
+    if not validate_crypto_id(data["crypto_id"]):
+        return jsonify({"error": "Criptomoeda não suportada"}), 400
+
+    if not is_valid_alert(data["indicator"], data["condition"]):
+        return jsonify({"error": "Combinação de indicador e condição não suportada"}), 400
+
+    try:
+        threshold = float(data["threshold"])
+    except (TypeError, ValueError):
+        return jsonify({"error": "Limite inválido"}), 400
 
-    cursor.execute('''INSERT INTO alerts (crypto_id, indicator, threshold, condition) 
-                      VALUES (?, ?, ?, ?)''',
-                      (data["crypto_id"], data["indicator"],
-                       data["threshold"], data["condition"]))
     try:
-        conn.commit()
+        with get_db_connection() as conn:
+            cursor = conn.execute('''INSERT INTO alerts (crypto_id, indicator, threshold, condition) 
+                                     VALUES (?, ?, ?, ?)''',
+                                  (data["crypto_id"], data["indicator"],
+                                   threshold, data["condition"]))
     except Exception as e:
         logger.error(f"Erro ao realizar commit: {e}")
-    finally:
-        conn.close()
-    alert_id = cursor.lastrowid,
+        return jsonify({"error": "Erro ao salvar alerta"}), 500
+    alert_id = cursor.lastrowid
+
+    # Atualizar o índice sem recarregar a tabela
+    alert_index.add({
+        "id": alert_id,
+        "crypto_id": data["crypto_id"],
+        "indicator": data["indicator"],
+        "threshold": threshold,
+        "condition": data["condition"],
+        "description": None
+    })
+    poll_scheduler.wake()
     return jsonify({"id": alert_id, "message": "Alerta criado com sucesso"}), 201
 
 @app.route("/alerts/<int:alert_id>", methods=["DELETE"])
 def delete_alert(alert_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("UPDATE alerts SET status = 'deleted' WHERE id = ?", (alert_id,))
     try:
-        conn.commit()
+        with get_db_connection() as conn:
+            conn.execute("UPDATE alerts SET status = 'deleted' WHERE id = ?", (alert_id,))
     except Exception as e:
         logger.error(f"Erro ao realizar commit: {e}")
-    finally:
-        conn.close()
+        return jsonify({"error": "Erro ao excluir alerta"}), 500
+    alert_index.remove(alert_id)
     return jsonify({"message": "Alerta excluído com sucesso"})
 
 def create_default_alerts():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     default_alerts = [
         # Alertas de RSI
         {
@@ -750,98 +1098,182 @@ def create_default_alerts():
         }
     ]
     
-    for alert in default_alerts:
-        cursor.execute('''INSERT INTO alerts 
-                         (crypto_id, indicator, threshold, condition, description, status)
-                         VALUES (?, ?, ?, ?, ?, 'active')''',
-                      (alert["crypto_id"], alert["indicator"], 
-                       alert["threshold"], alert["condition"],
-                       alert["description"]))
-    
     try:
-        conn.commit()
+        # O bloco with confirma a transação e devolve a conexão ao pool
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            for alert in default_alerts:
+                cursor.execute('''INSERT INTO alerts 
+                                 (crypto_id, indicator, threshold, condition, description, status)
+                                 VALUES (?, ?, ?, ?, ?, 'active')''',
+                              (alert["crypto_id"], alert["indicator"], 
+                               alert["threshold"], alert["condition"],
+                               alert["description"]))
     except Exception as e:
         logger.error(f"Erro ao realizar commit: {e}")
+        return
+    logger.info("Alertas padrão criados com sucesso")
+
+def alert_indicator_values(data):
+    """Extrai de uma análise os valores comparados com os limites dos alertas"""
+    indicators = data["technical_indicators"]
+    price = data["current_price"]
+    values = {"price": price}
+
+    if "rsi" in indicators:
+        values["rsi"] = indicators["rsi"]
+    if "volatility" in indicators:
+        values["volatility"] = indicators["volatility"]
+    if "bollinger_bands" in indicators:
+        upper = indicators["bollinger_bands"]["upper"]
+        lower = indicators["bollinger_bands"]["lower"]
+        values["bollinger_above"] = (price - upper) / upper * 100
+        values["bollinger_below"] = (price - lower) / lower * 100
+    if "support_resistance" in indicators:
+        support = indicators["support_resistance"]["support"]
+        resistance = indicators["support_resistance"]["resistance"]
+        values["support"] = abs((price - support) / support * 100)
+        values["resistance"] = abs((price - resistance) / resistance * 100)
+
+    return values
+
+def load_alert_index():
+    """Carrega no índice os alertas ativos que ainda não notificaram"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM alerts WHERE status = 'active' AND notification_sent = 0")
+        alert_index.load(dict(row) for row in cursor.fetchall())
     finally:
         conn.close()
-    logger.info("Alertas padrão criados com sucesso")
+    logger.info(f"Índice de alertas carregado com {len(alert_index)} alertas")
 
-def check_technical_alert(alert, data):
-    if alert["indicator"] == "rsi":
-        current_value = data["technical_indicators"]["rsi"]
-    elif alert["indicator"] == "bollinger":
-        price = data["current_price"]
-        upper = data["technical_indicators"]["bollinger_bands"]["upper"]
-        lower = data["technical_indicators"]["bollinger_bands"]["lower"]
-        if alert["condition"] == "above":
-            current_value = (price - upper) / upper * 100
-        else:
-            current_value = (price - lower) / lower * 100
-    elif alert["indicator"] == "volatility":
-        current_value = data["technical_indicators"]["volatility"]
-    elif alert["indicator"] in ["support", "resistance"]:
-        price = data["current_price"]
-        support = data["technical_indicators"]["support_resistance"]["support"]
-        resistance = data["technical_indicators"]["support_resistance"]["resistance"]
-        if alert["indicator"] == "support":
-            current_value = abs((price - support) / support * 100)
-        else:
-            current_value = abs((price - resistance) / resistance * 100)
-        return current_value <= 1  # 1% de distância
-        
-    if alert["condition"] == "above":
-        return current_value > alert["threshold"]
-    elif alert["condition"] == "below":
-        return current_value < alert["threshold"]
-    elif alert["condition"] == "near":
-        return current_value <= 1  # 1% de distância
-    
-    return False
+def streaming_alert_values(crypto_id, price, timestamp):
+    """Valores de alerta a partir dos indicadores incrementais da moeda"""
+    state = indicator_states.get(crypto_id)
+    if state is None:
+        # Primeira vez: iniciar o estado pela série do último dia e aplicar o tick
+        market_data = fetch_market_data(crypto_id, ALERT_ANALYSIS_DAYS, PRIORITY_BACKGROUND)
+        state = indicator_states.seed(crypto_id, [(point[0] / 1000, point[1])
+                                                  for point in market_data["prices"]])
+        state.update(price, timestamp)
+
+    current = state.values()
+    upper = current["bollinger_upper"]
+    lower = current["bollinger_lower"]
+    return {
+        "price": price,
+        "rsi": current["rsi"],
+        "bollinger_above": (price - upper) / upper * 100,
+        "bollinger_below": (price - lower) / lower * 100
+    }
+
+def alert_analysis(crypto_id, price=None):
+    """Análise usada pelos alertas, com o preço do tick como preço atual se informado"""
+    market_data = fetch_market_data(crypto_id, ALERT_ANALYSIS_DAYS, PRIORITY_BACKGROUND)
+    analysis_data, _ = get_analysis(crypto_id, ALERT_ANALYSIS_DAYS, market_data)
+    if price is not None:
+        analysis_data = dict(analysis_data, current_price=price)
+    return analysis_data
+
+def evaluate_coin_alerts(crypto_id, price=None, timestamp=None):
+    """Alertas pendentes da moeda disparados pelo preço informado (ou pela análise atual)"""
+    value_names = alert_index.value_names(crypto_id)
+    if not value_names:
+        return []
+
+    if price is None or timestamp is None:
+        # Sem tick: todos os valores vêm da análise atual
+        return alert_index.match(crypto_id, alert_indicator_values(alert_analysis(crypto_id)))
+
+    # A fonte de cada valor depende só do indicador do alerta, e não dos outros
+    # alertas da moeda: preço do tick, estado incremental ou análise completa
+    values = {"price": price}
+    if value_names & STREAMING_ALERT_VALUES:
+        streaming = streaming_alert_values(crypto_id, price, timestamp)
+        values.update((name, streaming[name]) for name in STREAMING_ALERT_VALUES)
+    analysis_names = value_names - STREAMING_ALERT_VALUES - {"price"}
+    if analysis_names:
+        analysis_values = alert_indicator_values(alert_analysis(crypto_id, price))
+        values.update((name, analysis_values[name]) for name in analysis_names if name in analysis_values)
+
+    return alert_index.match(crypto_id, values)
+
+def notify_triggered_alerts(triggered):
+    updates = []
+    for alert, value_to_show in triggered:
+        send_alert_email(alert, value_to_show)
+        updates.append((value_to_show, alert["id"]))
+        # Alertas notificados deixam o índice
+        alert_index.remove(alert["id"])
+
+    if updates:
+        # Todas as atualizações em uma única transação
+        conn = get_db_connection()
+        try:
+            with conn:
+                conn.executemany('''UPDATE alerts 
+                                    SET triggered_value = ?, notification_sent = 1,
+                                        updated_at = CURRENT_TIMESTAMP
+                                    WHERE id = ?''', updates)
+        finally:
+            conn.close()
 
 def check_alerts():
+    """Avalia alertas a cada atualização de preço publicada no barramento"""
+    subscriber = price_events.subscribe()
     while True:
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM alerts WHERE status = 'active'")
-            alerts = [dict(row) for row in cursor.fetchall()]
-
-            for alert in alerts:
-                crypto_id = alert["crypto_id"]
+            # Várias atualizações da mesma moeda na fila viram uma única avaliação
+            updates = drain_latest(subscriber)
+            triggered = []
+            for crypto_id, update in updates.items():
+                indicator_states.update(crypto_id, update.price, update.timestamp)
+                correlation_engines.update(crypto_id, update.price, update.timestamp)
                 try:
-                    market_data = fetch_market_data(crypto_id, 1)
-                    analysis_data = analyze_crypto_data(crypto_id, market_data)
-                    
-                    if alert["indicator"] == "price":
-                        current_value = analysis_data["current_price"]
-                        condition_met = (
-                            (alert["condition"] == "above" and current_value > alert["threshold"]) or
-                            (alert["condition"] == "below" and current_value < alert["threshold"])
-                        )
-                    else:
-                        condition_met = check_technical_alert(alert, analysis_data)
-
-                    if condition_met and not alert["notification_sent"]:
-                        if alert["indicator"] == "price":
-                            value_to_show = current_value
-                        else:
-                            value_to_show = alert["threshold"]
-                            
-                        send_alert_email(alert, value_to_show)
-                        cursor.execute('''UPDATE alerts 
-                                        SET triggered_value = ?, notification_sent = 1,
-                                            updated_at = CURRENT_TIMESTAMP
-                                        WHERE id = ?''',
-                                     (value_to_show, alert["id"]))
+                    triggered.extend(evaluate_coin_alerts(crypto_id, update.price, update.timestamp))
                 except Exception as e:
-                    logger.error(f"Erro ao verificar alerta {alert['id']}: {e}")
-                    continue
-
-            conn.commit()
+                    logger.error(f"Erro ao verificar alertas de {crypto_id}: {e}")
+            notify_triggered_alerts(triggered)
         except Exception as e:
             logger.error(f"Erro ao verificar alertas: {e}")
-        finally:
-            time.sleep(60)  # Verificar a cada minuto
+
+def polled_coins():
+    """Moedas com alertas e moedas das correlações em uso, que dependem dos ticks"""
+    return sorted(set(alert_index.coins()) | correlation_engines.crypto_ids())
+
+def poll_prices():
+    """Consulta preços das moedas monitoradas, com frequência adaptada à volatilidade"""
+    while True:
+        coins = polled_coins()
+        try:
+            due = poll_scheduler.due(coins)
+            if due:
+                # Uma única chamada em lote para todas as moedas vencidas
+                current_prices = fetch_current_prices(due, PRIORITY_BACKGROUND)
+                for crypto_id in due:
+                    quote = current_prices.get(crypto_id)
+                    if quote is None:
+                        poll_scheduler.postpone([crypto_id], POLL_ERROR_DELAY)
+                        continue
+                    poll_scheduler.record(crypto_id, quote["price"])
+                    price_events.publish(crypto_id, quote["price"], quote["last_updated_at"])
+        except Exception as e:
+            logger.error(f"Erro ao consultar preços: {e}")
+            poll_scheduler.postpone(coins, POLL_ERROR_DELAY)
+
+        poll_scheduler.wait(poll_scheduler.seconds_until_next(polled_coins()))
+
+def maintain_price_history():
+    """Consolida e poda o histórico de preços periodicamente"""
+    while True:
+        try:
+            # Gravar os ticks ainda no buffer antes de consolidar
+            price_buffer.flush()
+            price_retention.run_maintenance()
+        except Exception as e:
+            logger.error(f"Erro na manutenção do histórico de preços: {e}")
+        time.sleep(PRICE_MAINTENANCE_INTERVAL)
 
 @app.route("/")
 def home():
@@ -852,17 +1284,69 @@ def home():
         "endpoints": {
             "GET /": "Informações da API",
             "GET /analyze": "Análise de criptomoeda",
+            "GET /analyze/batch": "Tendência, RSI, força do mercado e variações de todas as moedas",
+            "GET /correlation": "Correlação e covariância móveis entre as moedas",
             "GET /alerts": "Listar alertas",
             "POST /alerts": "Criar alerta",
-            "DELETE /alerts/<id>": "Excluir alerta"
+            "DELETE /alerts/<id>": "Excluir alerta",
+            "POST /backtest/batch": "Backtest de várias moedas e parâmetros em paralelo",
+            "GET /history": "Histórico de preços em candles OHLC",
+            "GET /prices": "Série de preços em formato compacto (JSON colunar ou binário)",
+            "GET /cache/stats": "Estatísticas do cache de dados de mercado"
         }
     })
 
+@app.route("/correlation", methods=["GET"])
+def get_correlation():
+    """Matrizes móveis de correlação e covariância dos log-retornos das moedas"""
+    interval = request.args.get("interval", "hourly")
+    window = request.args.get("window", CORRELATION_DEFAULT_WINDOW, type=int)
+    crypto_ids = request.args.get("crypto_ids")
+    crypto_ids = crypto_ids.split(",") if crypto_ids else list(SUPPORTED_CRYPTOCURRENCIES)
+
+    invalid = [crypto_id for crypto_id in crypto_ids if not validate_crypto_id(crypto_id)]
+    if invalid:
+        return jsonify({"error": f"Criptomoeda não suportada: {', '.join(invalid)}"}), 400
+    if interval not in INTERVAL_MS or not 2 <= window <= CORRELATION_MAX_WINDOW:
+        return jsonify({"error": f"Use interval hourly/daily e window entre 2 e {CORRELATION_MAX_WINDOW}"}), 400
+
+    step_ms = INTERVAL_MS[interval]
+    # Histórico para a janela inteira mais a barra em andamento, na granularidade pedida
+    days = (window + 2) * step_ms // (24 * 3600 * 1000) + 2
+    try:
+        state = correlation_engines.matrices(
+            crypto_ids, step_ms, window,
+            lambda: fetch_market_data_many(crypto_ids, days, interval=interval))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        logger.error(f"Erro ao calcular correlações: {e}")
+        return jsonify({"error": "Erro ao calcular correlações"}), 500
+
+    # As moedas passam a ser consultadas pelo poller para fechar as próximas barras
+    poll_scheduler.wake()
+    return jsonify({
+        "interval": interval,
+        "window": window,
+        "crypto_ids": state["crypto_ids"],
+        "observations": state["observations"],
+        "correlation": np.round(state["correlation"], 4).tolist(),
+        "covariance": state["covariance"].tolist(),
+        "updated_at": datetime.fromtimestamp(state["updated_at"]).isoformat()
+    })
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(dict(market_cache.stats(), analysis_snapshots=analysis_cache.stats()))
+
 def recreate_database():
+    # Fechar conexões do pool antes de remover o arquivo
+    database.close_all()
     try:
-        # Remover banco de dados existente
-        if os.path.exists("crypto_smart_trader.db"):
-            os.remove("crypto_smart_trader.db")
+        # Remover banco de dados existente (e os arquivos do WAL)
+        for path in (DATABASE_PATH, f"{DATABASE_PATH}-wal", f"{DATABASE_PATH}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
     except PermissionError:
         logger.warning("Não foi possível remover o banco de dados existente. Continuando...")
     except Exception as e:
@@ -876,140 +1360,71 @@ def recreate_database():
     
     logger.info("Banco de dados recriado com sucesso")
 
-def backtest_strategy(prices, strategy_params):
-    results = {
-        'trades': [],
-        'profit_loss': 0,
-        'win_rate': 0,
-        'total_trades': 0
-    }
-    
-    if len(prices) < 50:  # Precisamos de pelo menos 50 períodos para os indicadores
-        return results
-    
-    position = None
-    entry_price = 0
-    total_trades = 0
-    winning_trades = 0
-    total_profit_loss = 0
-    
-    # Converter lista de preços para array numpy
+def price_columns(prices):
+    """Converte a lista [[ts, preço], ...] da API em (array de preços, timestamps)"""
     prices_array = np.array([price[1] for price in prices])
     timestamps = [price[0] for price in prices]
-    
-    for i in range(50, len(prices_array)-1):
-        current_price = prices_array[i]
-        next_price = prices_array[i+1]
-        
-        # Calcular indicadores
-        rsi = calculate_rsi(prices_array[max(0, i-14):i+1])
-        sma_20 = calculate_sma(prices_array[max(0, i-20):i+1], 20)[-1]
-        ema_50 = calculate_ema(prices_array[max(0, i-50):i+1], 50)[-1]
-        
-        # Regras de entrada
-        if position is None:  # Se não estiver em posição
-            if (rsi < strategy_params.get('rsi_oversold', 30) and 
-                current_price > sma_20 * 1.01):  # Confirmação de tendência
-                position = 'long'
-                entry_price = current_price
-                results['trades'].append({
-                    'type': 'entry',
-                    'position': 'long',
-                    'price': float(current_price),
-                    'rsi': float(rsi),
-                    'timestamp': timestamps[i]
-                })
-            elif (rsi > strategy_params.get('rsi_overbought', 70) and 
-                  current_price < sma_20 * 0.99):  # Confirmação de tendência
-                position = 'short'
-                entry_price = current_price
-                results['trades'].append({
-                    'type': 'entry',
-                    'position': 'short',
-                    'price': float(current_price),
-                    'rsi': float(rsi),
-                    'timestamp': timestamps[i]
-                })
-        
-        # Regras de saída
-        elif position == 'long':
-            stop_loss = entry_price * (1 - strategy_params.get('stop_loss', 0.02))
-            take_profit = entry_price * (1 + strategy_params.get('stop_loss', 0.02) * 1.5)  # Take profit 1.5x o stop loss
-            
-            if (current_price <= stop_loss or 
-                current_price >= take_profit or 
-                rsi > strategy_params.get('rsi_overbought', 70)):
-                pl = ((current_price - entry_price) / entry_price) * 100
-                total_profit_loss += pl
-                total_trades += 1
-                if pl > 0:
-                    winning_trades += 1
-                results['trades'].append({
-                    'type': 'exit',
-                    'position': position,
-                    'entry_price': float(entry_price),
-                    'exit_price': float(current_price),
-                    'profit_loss': float(pl),
-                    'rsi': float(rsi),
-                    'timestamp': timestamps[i]
-                })
-                position = None
-        
-        elif position == 'short':
-            stop_loss = entry_price * (1 + strategy_params.get('stop_loss', 0.02))
-            take_profit = entry_price * (1 - strategy_params.get('stop_loss', 0.02) * 1.5)  # Take profit 1.5x o stop loss
-            
-            if (current_price >= stop_loss or 
-                current_price <= take_profit or 
-                rsi < strategy_params.get('rsi_oversold', 30)):
-                pl = ((entry_price - current_price) / entry_price) * 100
-                total_profit_loss += pl
-                total_trades += 1
-                if pl > 0:
-                    winning_trades += 1
-                results['trades'].append({
-                    'type': 'exit',
-                    'position': position,
-                    'entry_price': float(entry_price),
-                    'exit_price': float(current_price),
-                    'profit_loss': float(pl),
-                    'rsi': float(rsi),
-                    'timestamp': timestamps[i]
-                })
-                position = None
-    
-    # Fechar posição aberta no final do período
-    if position is not None:
-        current_price = prices_array[-1]
-        if position == 'long':
-            pl = ((current_price - entry_price) / entry_price) * 100
-        else:
-            pl = ((entry_price - current_price) / entry_price) * 100
-        
-        total_profit_loss += pl
-        total_trades += 1
-        if pl > 0:
-            winning_trades += 1
-        
-        results['trades'].append({
-            'type': 'exit',
-            'position': position,
-            'entry_price': float(entry_price),
-            'exit_price': float(current_price),
-            'profit_loss': float(pl),
-            'rsi': float(rsi),
-            'timestamp': timestamps[-1]
-        })
-    
-    # Calcular estatísticas finais
-    results['total_trades'] = total_trades
-    results['win_rate'] = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-    results['profit_loss'] = total_profit_loss
-    
-    # Limitar a 10 últimas operações
-    results['trades'] = results['trades'][-10:]
-    
-    return results
+    return prices_array, timestamps
+
+def is_positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+def backtest_series_available(prices_array):
+    """Série com histórico suficiente para o aquecimento dos indicadores do backtest"""
+    return len(prices_array) >= WARMUP_PERIODS
+
+def load_backtest_prices(crypto_id, days, source="api", interval=None):
+    """Preços e timestamps do período, da API/armazenamento local ou do arquivo colunar.
+
+    Levanta ValueError se a série não existir ou for curta demais para o backtest.
+    """
+    interval = interval or interval_for_days(days)
+    if source == "archive":
+        # Views sem cópia dos arquivos mapeados em memória
+        since_ms = int(time.time() * 1000) - days * 24 * 3600 * 1000
+        columns = price_archive.window(crypto_id, interval, since_ms)
+        prices_array, timestamps = columns['price'], columns['ts']
+    else:
+        market_data = fetch_market_data(crypto_id, days, interval=interval)
+        if not market_data or not market_data.get('prices'):
+            raise ValueError("Erro ao obter dados do mercado")
+        prices_array, timestamps = price_columns(market_data["prices"])
+
+    if not backtest_series_available(prices_array):
+        raise ValueError(f"Histórico insuficiente para o backtest de {crypto_id} "
+                         f"(mínimo de {WARMUP_PERIODS} barras)")
+    return prices_array, timestamps
+
+def backtest_strategy(prices_array, timestamps, strategy_params):
+    combinations = [resolve_strategy_params(strategy_params)]
+    return run_backtest_grid(prices_array, timestamps, combinations)[0]
+
+def backtest_parameter_sweep(prices_array, timestamps, strategy_params, param_grid):
+    """Executa a estratégia principal e a grade de parâmetros em uma única passada"""
+    combinations = [resolve_strategy_params(strategy_params)] + expand_param_grid(param_grid)
+    all_results = run_backtest_grid(prices_array, timestamps, combinations)
+
+    sweep = [
+        {"strategy_params": params, "results": results}
+        for params, results in zip(combinations[1:], all_results[1:])
+    ]
+    sweep.sort(key=lambda item: item["results"]["profit_loss"], reverse=True)
+    return all_results[0], sweep
+
+def backtest_walk_forward(prices_array, timestamps, param_grid, walk_forward_params):
+    """Walk-forward com janelas em dias convertidas para barras pelo espaçamento da série"""
+    if len(timestamps) < 2:
+        raise ValueError("Histórico insuficiente para walk-forward")
+    bar_ms = float(np.median(np.diff(np.asarray(timestamps, dtype=np.int64))))
+    bars_per_day = 24 * 3600 * 1000 / bar_ms
+
+    def to_bars(name, default=None):
+        value = walk_forward_params.get(name, default)
+        return None if value is None else max(1, round(float(value) * bars_per_day))
+
+    return walk_forward(prices_array, timestamps, param_grid,
+                        to_bars("in_sample_days", 30), to_bars("out_of_sample_days", 7),
+                        to_bars("step_days"))
 
 @app.route("/backtest", methods=["POST"])
 def run_backtest():
@@ -1025,12 +1440,60 @@ def run_backtest():
 
         if not validate_crypto_id(crypto_id):
             return jsonify({"error": "Criptomoeda não suportada"}), 400
+        if not is_positive_int(days):
+            return jsonify({"error": "days deve ser um inteiro positivo"}), 400
 
-        market_data = fetch_market_data(crypto_id, days)
-        if not market_data or 'prices' not in market_data:
-            return jsonify({"error": "Erro ao obter dados do mercado"}), 500
-            
-        results = backtest_strategy(market_data["prices"], strategy_params)
+        source = data.get("source", "api")
+        if source not in ("api", "archive"):
+            return jsonify({"error": "Fonte de dados inválida"}), 400
+        interval = data.get("interval")
+        if interval is not None and interval not in INTERVAL_MS:
+            return jsonify({"error": "Intervalo inválido"}), 400
+
+        try:
+            prices_array, timestamps = load_backtest_prices(crypto_id, days, source, interval)
+        except ValueError as e:
+            # Mesma resposta do backtest em lote quando nenhuma série está disponível
+            return jsonify({"error": str(e)}), 503
+
+        param_grid = data.get("param_grid")
+        walk_forward_params = data.get("walk_forward")
+        # true usa as janelas padrão; um objeto define in_sample_days, out_of_sample_days e step_days
+        if walk_forward_params is True:
+            walk_forward_params = {}
+        elif walk_forward_params in (None, False):
+            walk_forward_params = None
+        elif not isinstance(walk_forward_params, dict):
+            return jsonify({"error": "walk_forward deve ser true ou um objeto com as janelas em dias"}), 400
+
+        if walk_forward_params is not None:
+            try:
+                report = backtest_walk_forward(prices_array, timestamps, param_grid or {}, walk_forward_params)
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": str(e)}), 400
+
+            return jsonify({
+                "crypto_id": crypto_id,
+                "period": f"{days} dias",
+                "walk_forward": walk_forward_params,
+                **report
+            })
+
+        if param_grid:
+            try:
+                results, sweep = backtest_parameter_sweep(prices_array, timestamps, strategy_params, param_grid)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            return jsonify({
+                "crypto_id": crypto_id,
+                "period": f"{days} dias",
+                "strategy_params": strategy_params,
+                "results": results,
+                "sweep": sweep
+            })
+
+        results = backtest_strategy(prices_array, timestamps, strategy_params)
         
         return jsonify({
             "crypto_id": crypto_id,
@@ -1042,8 +1505,93 @@ def run_backtest():
         logger.error(f"Erro no backtesting: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/backtest/batch", methods=["POST"])
+def run_batch_backtest_endpoint():
+    """Backtest de várias moedas x grade de parâmetros em processos paralelos"""
+    try:
+        data = request.get_json() or {}
+        crypto_ids = data.get("crypto_ids") or list(SUPPORTED_CRYPTOCURRENCIES)
+        days = data.get("days", 30)
+        source = data.get("source", "api")
+        top = data.get("top", 50)
+
+        if not isinstance(crypto_ids, list):
+            return jsonify({"error": "crypto_ids deve ser uma lista"}), 400
+        if not is_positive_int(days) or not is_positive_int(top):
+            return jsonify({"error": "days e top devem ser inteiros positivos"}), 400
+        interval = data.get("interval") or interval_for_days(days)
+
+        invalid = [crypto_id for crypto_id in crypto_ids if not validate_crypto_id(crypto_id)]
+        if invalid:
+            return jsonify({"error": f"Criptomoeda não suportada: {', '.join(invalid)}"}), 400
+        if source not in ("api", "archive"):
+            return jsonify({"error": "Fonte de dados inválida"}), 400
+        if interval not in INTERVAL_MS:
+            return jsonify({"error": "Intervalo inválido"}), 400
+
+        try:
+            combinations = expand_param_grid(data.get("param_grid") or {})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        start = time.perf_counter()
+        # Moedas sem série (ou com histórico curto demais, como em /backtest) ficam fora
+        # do ranking e são informadas à parte
+        if source == "archive":
+            since_ms = int(time.time() * 1000) - days * 24 * 3600 * 1000
+            available = [crypto_id for crypto_id in crypto_ids if backtest_series_available(
+                price_archive.window(crypto_id, interval, since_ms)['price'])]
+        else:
+            series = {}
+            for crypto_id, market_data in fetch_market_data_many(crypto_ids, days, interval=interval).items():
+                if market_data and market_data.get("prices"):
+                    prices_array, timestamps = price_columns(market_data["prices"])
+                    if backtest_series_available(prices_array):
+                        series[crypto_id] = (prices_array, timestamps)
+            available = list(series)
+
+        unavailable = [crypto_id for crypto_id in crypto_ids if crypto_id not in available]
+        if not available:
+            return jsonify({"error": "Nenhuma série disponível para o backtest",
+                            "unavailable": unavailable}), 503
+        crypto_ids = available
+        if source == "archive":
+            rows = run_batch_backtest(price_archive.root, crypto_ids, interval, combinations, since_ms,
+                                      BATCH_BACKTEST_WORKERS)
+        else:
+            rows = run_batch_from_series(series, interval, combinations, BATCH_BACKTEST_WORKERS)
+
+        return jsonify({
+            "period": f"{days} dias",
+            "crypto_ids": crypto_ids,
+            "unavailable": unavailable,
+            "combinations": len(combinations),
+            "elapsed_seconds": round(time.perf_counter() - start, 3),
+            "ranking": rows[:top]
+        })
+    except Exception as e:
+        logger.error(f"Erro no backtest em lote: {e}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == "__main__":
     recreate_database()  # Recriar o banco de dados
+    load_alert_index()
+    email_dispatcher.start()
+    atexit.register(email_dispatcher.stop)
+    price_buffer.start()
+    atexit.register(price_buffer.stop)
+    if os.path.exists(INDICATOR_STATE_PATH):
+        try:
+            indicator_states.load(INDICATOR_STATE_PATH)
+        except Exception as e:
+            logger.error(f"Erro ao restaurar indicadores incrementais: {e}")
+    atexit.register(indicator_states.save, INDICATOR_STATE_PATH)
     monitor_thread = Thread(target=check_alerts, daemon=True)
     monitor_thread.start()
+    poller_thread = Thread(target=poll_prices, daemon=True)
+    poller_thread.start()
+    maintenance_thread = Thread(target=maintain_price_history, daemon=True)
+    maintenance_thread.start()
+    warmer_thread = Thread(target=warm_analysis_snapshots, daemon=True)
+    warmer_thread.start()
     app.run(debug=True, host='0.0.0.0')
@@ -0,0 +1,325 @@
+import itertools
+import logging
+
+import numpy as np
+
+from indicators import rolling_rsi, sma
+
+logger = logging.getLogger(__name__)
+
+# Precisamos de pelo menos 50 períodos para os indicadores
+WARMUP_PERIODS = 50
+RSI_PERIOD = 14
+SMA_PERIOD = 20
+
+# Limite de combinações avaliadas em uma única varredura
+MAX_GRID_SIZE = 1000
+
+DEFAULT_STRATEGY_PARAMS = {
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+    'stop_loss': 0.02
+}
+
+
+def resolve_strategy_params(strategy_params):
+    """Completa os parâmetros da estratégia com os valores padrão"""
+    strategy_params = strategy_params or {}
+    return {
+        name: strategy_params.get(name, default)
+        for name, default in DEFAULT_STRATEGY_PARAMS.items()
+    }
+
+
+def expand_param_grid(param_grid):
+    """Gera todas as combinações (rsi_oversold x rsi_overbought x stop_loss) da grade"""
+    axes = []
+    for name, default in DEFAULT_STRATEGY_PARAMS.items():
+        values = param_grid.get(name, [default])
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        if not values:
+            raise ValueError(f"Grade de parâmetros vazia para {name}")
+        axes.append(values)
+
+    combinations = [
+        dict(zip(DEFAULT_STRATEGY_PARAMS, values))
+        for values in itertools.product(*axes)
+    ]
+    if len(combinations) > MAX_GRID_SIZE:
+        raise ValueError(f"Grade de parâmetros excede o limite de {MAX_GRID_SIZE} combinações")
+    return combinations
+
+
+def compute_backtest_indicators(prices_array):
+    """Calcula uma única vez as séries completas de RSI e SMA usadas pela estratégia"""
+    # RSI da janela dos últimos 14 deltas em cada barra (mesma janela da versão por
+    # barra) e SMA de 20 períodos, ambos alinhados ao índice da barra
+    return {'rsi': rolling_rsi(prices_array, RSI_PERIOD), 'sma_20': sma(prices_array, SMA_PERIOD)}
+
+
+def _empty_results():
+    return {
+        'trades': [],
+        'profit_loss': 0,
+        'win_rate': 0,
+        'total_trades': 0,
+        'max_drawdown': 0
+    }
+
+
+def _plain(timestamp):
+    # Timestamps vindos de arrays NumPy (memmap) viram int/float do Python
+    return timestamp.item() if isinstance(timestamp, np.generic) else timestamp
+
+
+def _entry_trade(position, price, rsi, timestamp):
+    return {
+        'type': 'entry',
+        'position': position,
+        'price': float(price),
+        'rsi': float(rsi),
+        'timestamp': _plain(timestamp)
+    }
+
+
+def _exit_trade(position, entry_price, exit_price, pl, rsi, timestamp):
+    return {
+        'type': 'exit',
+        'position': position,
+        'entry_price': float(entry_price),
+        'exit_price': float(exit_price),
+        'profit_loss': float(pl),
+        'rsi': float(rsi),
+        'timestamp': _plain(timestamp)
+    }
+
+
+def _update_drawdown(p, total_profit_loss, peak_profit_loss, max_drawdown):
+    if total_profit_loss[p] > peak_profit_loss[p]:
+        peak_profit_loss[p] = total_profit_loss[p]
+    drawdown = peak_profit_loss[p] - total_profit_loss[p]
+    if drawdown > max_drawdown[p]:
+        max_drawdown[p] = drawdown
+
+
+def run_backtest_grid(prices_array, timestamps, combinations, indicators=None):
+    """Avalia todas as combinações de parâmetros em uma única passada sobre as barras.
+
+    O estado de cada combinação (posição, preço de entrada, P/L acumulado) é um vetor
+    NumPy, de modo que o custo por barra é o mesmo para uma ou mil combinações.
+    """
+    if len(prices_array) < WARMUP_PERIODS:
+        return [_empty_results() for _ in combinations]
+
+    if indicators is None:
+        indicators = compute_backtest_indicators(prices_array)
+    rsi_series = indicators['rsi']
+    sma_series = indicators['sma_20']
+
+    rsi_oversold = np.array([params['rsi_oversold'] for params in combinations], dtype=float)
+    rsi_overbought = np.array([params['rsi_overbought'] for params in combinations], dtype=float)
+    stop_loss = np.array([params['stop_loss'] for params in combinations], dtype=float)
+
+    # Níveis relativos de stop loss e take profit (1.5x o stop loss)
+    long_stop = 1 - stop_loss
+    long_take = 1 + stop_loss * 1.5
+    short_stop = 1 + stop_loss
+    short_take = 1 - stop_loss * 1.5
+
+    # Confirmações de tendência independem dos parâmetros
+    long_confirmed = prices_array > sma_series * 1.01
+    short_confirmed = prices_array < sma_series * 0.99
+
+    # Barras onde alguma combinação pode abrir posição; as demais só importam
+    # enquanto houver posição aberta
+    entry_candidates = (
+        (long_confirmed & (rsi_series < rsi_oversold.max())) |
+        (short_confirmed & (rsi_series > rsi_overbought.min()))
+    )
+
+    size = len(combinations)
+    position = np.zeros(size, dtype=np.int8)  # 1 = long, -1 = short, 0 = fora
+    entry_price = np.zeros(size)
+    entry_index = np.zeros(size, dtype=np.int64)
+    total_profit_loss = np.zeros(size)
+    total_trades = np.zeros(size, dtype=np.int64)
+    winning_trades = np.zeros(size, dtype=np.int64)
+    # Maior queda do P/L acumulado (em pontos percentuais) a partir do pico anterior
+    peak_profit_loss = np.zeros(size)
+    max_drawdown = np.zeros(size)
+    events = [[] for _ in range(size)]
+
+    last_index = len(prices_array) - 1
+    has_position = False
+    for i in range(WARMUP_PERIODS, last_index):
+        if not has_position and not entry_candidates[i]:
+            continue
+
+        current_price = prices_array[i]
+        rsi = rsi_series[i]
+
+        is_long = position == 1
+        is_short = position == -1
+        is_flat = position == 0
+
+        # Regras de saída
+        exit_long = is_long & (
+            (current_price <= entry_price * long_stop) |
+            (current_price >= entry_price * long_take) |
+            (rsi > rsi_overbought)
+        )
+        exit_short = is_short & (
+            (current_price >= entry_price * short_stop) |
+            (current_price <= entry_price * short_take) |
+            (rsi < rsi_oversold)
+        )
+
+        # Regras de entrada
+        enter_long = is_flat & (rsi < rsi_oversold) & long_confirmed[i]
+        enter_short = is_flat & ~enter_long & (rsi > rsi_overbought) & short_confirmed[i]
+
+        exiting = exit_long | exit_short
+        if exiting.any():
+            for p in np.flatnonzero(exiting):
+                if exit_long[p]:
+                    side = 'long'
+                    pl = ((current_price - entry_price[p]) / entry_price[p]) * 100
+                else:
+                    side = 'short'
+                    pl = ((entry_price[p] - current_price) / entry_price[p]) * 100
+                total_profit_loss[p] += pl
+                total_trades[p] += 1
+                if pl > 0:
+                    winning_trades[p] += 1
+                _update_drawdown(p, total_profit_loss, peak_profit_loss, max_drawdown)
+                events[p].append(('exit', side, entry_index[p], i, pl))
+            position[exiting] = 0
+
+        entering = enter_long | enter_short
+        if entering.any():
+            position[enter_long] = 1
+            position[enter_short] = -1
+            entry_price[entering] = current_price
+            entry_index[entering] = i
+            for p in np.flatnonzero(entering):
+                events[p].append(('entry', 'long' if enter_long[p] else 'short', i))
+
+        has_position = bool(position.any())
+
+    # Fechar posição aberta no final do período
+    final_price = prices_array[-1]
+    for p in np.flatnonzero(position != 0):
+        if position[p] == 1:
+            side = 'long'
+            pl = ((final_price - entry_price[p]) / entry_price[p]) * 100
+        else:
+            side = 'short'
+            pl = ((entry_price[p] - final_price) / entry_price[p]) * 100
+        total_profit_loss[p] += pl
+        total_trades[p] += 1
+        if pl > 0:
+            winning_trades[p] += 1
+        _update_drawdown(p, total_profit_loss, peak_profit_loss, max_drawdown)
+        events[p].append(('close', side, entry_index[p], last_index, pl))
+
+    results = []
+    for p in range(size):
+        trades = []
+        # Apenas as 10 últimas operações são retornadas
+        for event in events[p][-10:]:
+            if event[0] == 'entry':
+                _, side, i = event
+                trades.append(_entry_trade(side, prices_array[i], rsi_series[i], timestamps[i]))
+            else:
+                kind, side, start, i, pl = event
+                # No fechamento final o RSI reportado é o da última barra avaliada
+                rsi_index = last_index - 1 if kind == 'close' else i
+                trades.append(_exit_trade(side, prices_array[start], prices_array[i], pl,
+                                          rsi_series[rsi_index], timestamps[i]))
+
+        trade_count = int(total_trades[p])
+        results.append({
+            'trades': trades,
+            'profit_loss': float(total_profit_loss[p]),
+            'win_rate': (winning_trades[p] / trade_count * 100) if trade_count > 0 else 0,
+            'total_trades': trade_count,
+            'max_drawdown': float(max_drawdown[p])
+        })
+
+    return results
+
+
+def _summary(results):
+    return {name: results[name] for name in ('profit_loss', 'win_rate', 'total_trades', 'max_drawdown')}
+
+
+def walk_forward(prices_array, timestamps, param_grid, in_sample_bars, out_of_sample_bars,
+                 step_bars=None, indicators=None):
+    """Otimização walk-forward: escolhe os parâmetros em cada janela in-sample e os
+    avalia na janela out-of-sample seguinte.
+
+    Os indicadores são calculados uma única vez sobre a série inteira e cada janela
+    recebe apenas fatias deles; as WARMUP_PERIODS barras anteriores à janela entram
+    na fatia para que as operações comecem exatamente no início da janela.
+    """
+    if in_sample_bars < 1 or out_of_sample_bars < 1:
+        raise ValueError("As janelas in-sample e out-of-sample devem ter ao menos uma barra")
+    step_bars = step_bars or out_of_sample_bars
+    if step_bars < 1:
+        raise ValueError("O passo entre janelas deve ter ao menos uma barra")
+
+    combinations = expand_param_grid(param_grid)
+    if indicators is None:
+        indicators = compute_backtest_indicators(prices_array)
+
+    def evaluate(start, end, params_list):
+        # +1: a última barra da fatia só é usada para fechar a posição aberta
+        begin = start - WARMUP_PERIODS
+        sliced = {name: values[begin:end + 1] for name, values in indicators.items()}
+        return run_backtest_grid(prices_array[begin:end + 1], timestamps[begin:end + 1],
+                                 params_list, sliced)
+
+    windows = []
+    n = len(prices_array)
+    start = WARMUP_PERIODS
+    while start + in_sample_bars + out_of_sample_bars < n:
+        split = start + in_sample_bars
+        end = split + out_of_sample_bars
+
+        in_sample = evaluate(start, split, combinations)
+        best = max(range(len(combinations)),
+                   key=lambda p: (in_sample[p]['profit_loss'], -in_sample[p]['max_drawdown']))
+        out_of_sample = evaluate(split, end, [combinations[best]])[0]
+
+        windows.append({
+            'in_sample': {'start': _plain(timestamps[start]), 'end': _plain(timestamps[split])},
+            'out_of_sample': {'start': _plain(timestamps[split]), 'end': _plain(timestamps[end])},
+            'strategy_params': combinations[best],
+            'in_sample_results': _summary(in_sample[best]),
+            'out_of_sample_results': _summary(out_of_sample)
+        })
+        start += step_bars
+
+    if not windows:
+        raise ValueError("Histórico insuficiente para uma janela in-sample + out-of-sample")
+
+    oos = [window['out_of_sample_results'] for window in windows]
+    total_trades = sum(result['total_trades'] for result in oos)
+    winning_trades = sum(result['win_rate'] * result['total_trades'] / 100 for result in oos)
+    total_profit_loss = sum(result['profit_loss'] for result in oos)
+    in_sample_profit_loss = sum(window['in_sample_results']['profit_loss'] for window in windows)
+    return {
+        'windows': windows,
+        'out_of_sample': {
+            'windows': len(windows),
+            'profitable_windows': sum(1 for result in oos if result['profit_loss'] > 0),
+            'profit_loss': total_profit_loss,
+            'average_profit_loss': total_profit_loss / len(windows),
+            'total_trades': total_trades,
+            'win_rate': (winning_trades / total_trades * 100) if total_trades > 0 else 0,
+            'max_drawdown': max(result['max_drawdown'] for result in oos),
+            # Fração do resultado in-sample que se manteve fora da amostra
+            'efficiency': (total_profit_loss / in_sample_profit_loss) if in_sample_profit_loss > 0 else None
+        }
+    }
@@ -0,0 +1,197 @@
+"""Backtests em lote de várias moedas e grades de parâmetros em processos paralelos.
+
+As séries são lidas pelos workers direto do arquivo colunar (np.memmap), de modo
+que apenas nomes de moedas e parâmetros trafegam entre os processos. Os workers
+formam um pool único do módulo, reaproveitado entre os lotes.
+
+Uso: python batch_backtest.py [crypto_id ...] --days 365 --grid '{"rsi_oversold": [20, 30]}'
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from backtesting import compute_backtest_indicators, expand_param_grid, run_backtest_grid
+from candle_store import interval_for_days
+from price_archive import PRICE_ARCHIVE_DIR, PriceArchive
+
+DAY_MS = 24 * 3600 * 1000
+
+# Séries e indicadores já abertos por cada processo worker; os workers vivem
+# entre lotes, então apenas as séries mais recentes ficam guardadas
+WORKER_CACHE_SIZE = 16
+_worker_series = {}
+
+# Pool de processos compartilhado pelos lotes. Os workers não são criados por
+# fork, que copiaria threads e conexões abertas do servidor
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+
+def _start_method():
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def get_executor(max_workers=None):
+    """Pool de processos do módulo, recriado apenas se o número de workers mudar"""
+    global _executor, _executor_workers
+    max_workers = max_workers or os.cpu_count() or 1
+    with _executor_lock:
+        if _executor is None or _executor_workers != max_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=max_workers,
+                                            mp_context=multiprocessing.get_context(_start_method()))
+            _executor_workers = max_workers
+        return _executor
+
+
+def _discard_executor(executor):
+    # Um worker morto quebra o pool inteiro; o próximo lote cria outro
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _load_series(root, crypto_id, interval, since_ms):
+    key = (root, crypto_id, interval, since_ms)
+    series = _worker_series.pop(key, None)
+    if series is None:
+        columns = PriceArchive(root).window(crypto_id, interval, since_ms)
+        prices_array = columns['price']
+        series = (prices_array, columns['ts'], compute_backtest_indicators(prices_array))
+        if len(_worker_series) >= WORKER_CACHE_SIZE:
+            _worker_series.pop(next(iter(_worker_series)))
+    # Reinserir deixa a série usada por último no fim da ordem de descarte
+    _worker_series[key] = series
+    return series
+
+
+def _run_job(root, crypto_id, interval, since_ms, combinations):
+    """Executado no worker: avalia um bloco de combinações de uma moeda"""
+    prices_array, timestamps, indicators = _load_series(root, crypto_id, interval, since_ms)
+    results = run_backtest_grid(prices_array, timestamps, combinations, indicators)
+    return [
+        {
+            "crypto_id": crypto_id,
+            "strategy_params": params,
+            "profit_loss": result["profit_loss"],
+            "win_rate": result["win_rate"],
+            "max_drawdown": result["max_drawdown"],
+            "total_trades": result["total_trades"]
+        }
+        for params, result in zip(combinations, results)
+    ]
+
+
+def stage_series(root, interval, series):
+    """Grava séries {crypto_id: (prices_array, timestamps)} como arquivo colunar temporário"""
+    archive = PriceArchive(root)
+    for crypto_id, (prices_array, timestamps) in series.items():
+        missing = np.full(len(prices_array), np.nan)
+        archive.append(crypto_id, interval, {
+            'ts': timestamps,
+            'price': prices_array,
+            'volume': missing,
+            'market_cap': missing
+        })
+    return archive
+
+
+def run_batch_backtest(root, crypto_ids, interval, combinations, since_ms=None, max_workers=None):
+    """Distribui os pares (moeda, bloco de combinações) entre processos e ranqueia os resultados.
+
+    Cada moeda é dividida em blocos suficientes para ocupar todos os workers; o
+    backtest já é vetorizado sobre as combinações de um mesmo bloco.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks_per_coin = min(len(combinations), max(1, math.ceil(max_workers / max(1, len(crypto_ids)))))
+    chunk_size = math.ceil(len(combinations) / chunks_per_coin)
+
+    rows = []
+    executor = get_executor(max_workers)
+    futures = [
+        executor.submit(_run_job, root, crypto_id, interval, since_ms,
+                        combinations[start:start + chunk_size])
+        for crypto_id in crypto_ids
+        for start in range(0, len(combinations), chunk_size)
+    ]
+    try:
+        for future in futures:
+            rows.extend(future.result())
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+    rows.sort(key=lambda row: (row["profit_loss"], -row["max_drawdown"]), reverse=True)
+    for rank, row in enumerate(rows, start=1):
+        row["rank"] = rank
+    return rows
+
+
+def run_batch_from_series(series, interval, combinations, max_workers=None):
+    """Como run_batch_backtest, para séries em memória (copiadas uma vez para memmap)"""
+    with tempfile.TemporaryDirectory(prefix="batch-backtest-") as root:
+        stage_series(root, interval, series)
+        return run_batch_backtest(root, list(series), interval, combinations, max_workers=max_workers)
+
+
+def format_table(rows):
+    lines = [f"{'#':>4}  {'moeda':<12} {'oversold':>8} {'overbought':>10} {'stop':>6} "
+             f"{'P/L %':>9} {'acerto %':>8} {'drawdown':>9} {'trades':>6}"]
+    for row in rows:
+        params = row["strategy_params"]
+        lines.append(f"{row['rank']:>4}  {row['crypto_id']:<12} {params['rsi_oversold']:>8} "
+                     f"{params['rsi_overbought']:>10} {params['stop_loss']:>6} "
+                     f"{row['profit_loss']:>9.2f} {row['win_rate']:>8.1f} "
+                     f"{row['max_drawdown']:>9.2f} {row['total_trades']:>6}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest em lote a partir do arquivo colunar de preços")
+    parser.add_argument("crypto_ids", nargs="*", help="Moedas (padrão: todas as arquivadas no intervalo)")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--interval", help="hourly ou daily (padrão: conforme --days)")
+    parser.add_argument("--grid", default="{}", help="Grade de parâmetros em JSON")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--root", default=PRICE_ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    interval = args.interval or interval_for_days(args.days)
+    crypto_ids = args.crypto_ids or sorted(
+        key.split("/")[0] for key in PriceArchive(args.root).index() if key.endswith(f"/{interval}")
+    )
+    if not crypto_ids:
+        parser.error("nenhuma série arquivada encontrada")
+
+    combinations = expand_param_grid(json.loads(args.grid))
+    since_ms = int(time.time() * 1000) - args.days * DAY_MS
+
+    start = time.perf_counter()
+    rows = run_batch_backtest(args.root, crypto_ids, interval, combinations, since_ms, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(format_table(rows[:args.top]))
+    print(f"\n{len(rows)} backtests ({len(crypto_ids)} moedas x {len(combinations)} combinações) "
+          f"em {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Vazão de GET/POST /alerts com conexões novas a cada chamada vs pool em WAL.
+
+Uso: python benchmarks/bench_alerts.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from storage import Database
+
+REQUESTS = 2_000
+
+CONFIGURATIONS = [
+    # (nome, parâmetros do Database)
+    ('Antes: conexão por chamada, journal padrão', {'pooled': False, 'wal': False}),
+    ('Depois: pool + WAL + synchronous=NORMAL', {'pooled': True, 'wal': True}),
+]
+
+
+def measure(client, method, path, payload=None):
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        if method == 'POST':
+            response = client.post(path, json=payload)
+        else:
+            response = client.get(path)
+        assert response.status_code in (200, 201), response.status_code
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def run(name, options):
+    with tempfile.TemporaryDirectory() as directory:
+        app.database = Database(os.path.join(directory, 'bench.db'), **options)
+        app.init_db()
+        client = app.app.test_client()
+
+        payload = {"crypto_id": "bitcoin", "indicator": "price", "threshold": 50000, "condition": "above"}
+        post_rate = measure(client, 'POST', '/alerts', payload)
+
+        # GET com uma tabela pequena para medir o custo de conexão, não de serialização
+        with app.get_db_connection() as conn:
+            conn.execute("UPDATE alerts SET status = 'deleted' WHERE id > 20")
+        get_rate = measure(client, 'GET', '/alerts')
+
+        app.database.close_all()
+        print(f"{name:<46}{post_rate:>12.0f}{get_rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    print(f"{'Configuração':<46}{'POST/s':>12}{'GET/s':>12}")
+    for name, options in CONFIGURATIONS:
+        run(name, options)
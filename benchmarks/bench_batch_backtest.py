@@ -0,0 +1,56 @@
+"""Escalabilidade do backtest em lote (15 moedas x 100 combinações) com o número de processos.
+
+Uso: python benchmarks/bench_batch_backtest.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtesting import expand_param_grid
+from batch_backtest import run_batch_backtest, stage_series
+
+COINS = 15
+BARS = 2 * 365 * 24  # dois anos de candles horários
+PARAM_GRID = {
+    'rsi_oversold': [20, 25, 30, 35, 40],
+    'rsi_overbought': [60, 65, 70, 75, 80],
+    'stop_loss': [0.01, 0.02, 0.05, 0.1]
+}
+
+
+def make_series(rng):
+    step = 3600 * 1000
+    timestamps = np.arange(BARS, dtype=np.int64) * step
+    series = {}
+    for coin in range(COINS):
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, BARS)))
+        series[f"coin-{coin}"] = (prices, timestamps)
+    return series
+
+
+def run():
+    combinations = expand_param_grid(PARAM_GRID)
+    series = make_series(np.random.default_rng(42))
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+
+    with tempfile.TemporaryDirectory() as root:
+        stage_series(root, 'hourly', series)
+        print(f"{COINS} moedas x {len(combinations)} combinações, {BARS:,} barras, {cpus} CPUs")
+        print(f"{'Processos':>10}{'Tempo (s)':>12}{'Speedup':>10}")
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            run_batch_backtest(root, list(series), 'hourly', combinations, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>10}{elapsed:>12.2f}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run()
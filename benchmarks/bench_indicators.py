@@ -0,0 +1,84 @@
+"""Compara os indicadores de app.py com as séries completas de indicators.py.
+
+Uso: python benchmarks/bench_indicators.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators
+from app import (calculate_bollinger_bands, calculate_ema, calculate_macd,
+                 calculate_rsi, calculate_sma, calculate_stochastic)
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+# Funções que só retornam o último valor são avaliadas barra a barra em uma
+# amostra e o tempo é extrapolado para a série inteira
+PER_BAR_SAMPLE = 2_000
+
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def per_bar(func, prices, warmup):
+    start = time.perf_counter()
+    for i in range(len(prices) - PER_BAR_SAMPLE, len(prices)):
+        func(prices[max(0, i - warmup):i + 1])
+    elapsed = time.perf_counter() - start
+    return elapsed * (len(prices) - warmup) / PER_BAR_SAMPLE
+
+
+def make_prices(size, seed=42):
+    rng = np.random.default_rng(seed)
+    return 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, size)))
+
+
+def run(size):
+    prices = make_prices(size)
+    rows = [
+        # (indicador, tempo atual, tempo novo, observação)
+        ('RSI (último valor)',
+         best_of(lambda: calculate_rsi(prices), repeat=1),
+         best_of(lambda: indicators.rsi(prices)),
+         'loop Python vs série completa'),
+        ('SMA 20',
+         best_of(lambda: calculate_sma(prices, 20)),
+         best_of(lambda: indicators.sma(prices, 20)),
+         ''),
+        ('EMA 50',
+         best_of(lambda: calculate_ema(prices, 50)),
+         best_of(lambda: indicators.ema(prices, 50)),
+         'convolução vs recursiva'),
+        ('MACD (último valor)',
+         best_of(lambda: calculate_macd(prices)),
+         best_of(lambda: indicators.macd(prices)),
+         ''),
+        ('Bollinger (série)',
+         per_bar(calculate_bollinger_bands, prices, 20),
+         best_of(lambda: indicators.bollinger_bands(prices)),
+         'atual estimado barra a barra'),
+        ('Estocástico (série)',
+         per_bar(calculate_stochastic, prices, 14),
+         best_of(lambda: indicators.stochastic(prices)),
+         'atual estimado barra a barra'),
+    ]
+
+    print(f"\n{size:,} pontos")
+    print(f"{'Indicador':<22}{'Atual (ms)':>14}{'Novo (ms)':>12}{'Ganho':>10}  Observação")
+    for name, current, new, note in rows:
+        print(f"{name:<22}{current * 1000:>14.2f}{new * 1000:>12.2f}{current / new:>9.1f}x  {note}")
+
+
+if __name__ == "__main__":
+    for size in SIZES:
+        run(size)
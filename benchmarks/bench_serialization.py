@@ -0,0 +1,71 @@
+"""Latência e tamanho das respostas com o jsonify padrão vs orjson + compressão + ETag.
+
+Uso: python benchmarks/bench_serialization.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import serialization
+from serialization import FastJSONProvider
+
+REQUESTS = 50
+BARS = 365 * 24  # um ano de preços horários
+
+
+def make_market_data(rng):
+    timestamps = 1_700_000_000_000 + np.arange(BARS, dtype=np.int64) * 3600 * 1000
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, BARS)))
+    return {
+        'prices': [[int(ts), float(price)] for ts, price in zip(timestamps, prices)],
+        'total_volumes': [[int(ts), float(price) * 1e6] for ts, price in zip(timestamps, prices)],
+        'market_caps': [[int(ts), float(price) * 1e9] for ts, price in zip(timestamps, prices)]
+    }
+
+
+def measure(client, path, headers=None):
+    client.get(path, headers=headers)
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = client.get(path, headers=headers)
+    elapsed = (time.perf_counter() - start) / REQUESTS * 1000
+    return elapsed, len(response.get_data()), response.status_code
+
+
+def run():
+    market_data = make_market_data(np.random.default_rng(42))
+    app.fetch_market_data = lambda crypto_id, days, *args, **kwargs: market_data
+    client = app.app.test_client()
+    paths = ['/analyze?crypto_id=bitcoin&days=365', '/prices?crypto_id=bitcoin&days=365&prices_format=json']
+
+    print(f"{BARS:,} pontos, média de {REQUESTS} requisições "
+          f"(orjson: {'sim' if serialization.orjson else 'não'}, brotli: {'sim' if serialization.brotli else 'não'})")
+    print(f"{'Configuração':<42}{'Endpoint':<10}{'ms':>8}{'bytes':>10}{'status':>8}")
+
+    for path in paths:
+        endpoint = path.split('?')[0]
+        app.app.json = DefaultJSONProvider(app.app)
+        before = measure(client, path)
+        app.app.json = FastJSONProvider(app.app)
+        after = measure(client, path)
+        compressed = measure(client, path, {'Accept-Encoding': 'br, gzip'})
+        etag = client.get(path).headers['ETag']
+        revalidated = measure(client, path, {'If-None-Match': etag})
+
+        for name, (elapsed, size, status) in [
+            ('Antes: jsonify padrão, sem compressão', before),
+            ('Depois: orjson', after),
+            ('Depois: orjson + compressão', compressed),
+            ('Depois: If-None-Match com ETag atual', revalidated),
+        ]:
+            print(f"{name:<42}{endpoint:<10}{elapsed:>8.2f}{size:>10,}{status:>8}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,211 @@
+import logging
+import os
+
+from storage import Database
+
+logger = logging.getLogger(__name__)
+
+# Banco separado do crypto_smart_trader.db, que é recriado a cada inicialização
+CANDLE_DB_PATH = os.getenv("CANDLE_DB_PATH", "market_data.db")
+candle_database = Database(CANDLE_DB_PATH, row_factory=None)
+
+# Duração de cada intervalo em milissegundos
+INTERVAL_MS = {
+    'hourly': 3600 * 1000,
+    'daily': 24 * 3600 * 1000
+}
+
+
+def get_candle_connection():
+    return candle_database.connect()
+
+
+def init_candle_store():
+    conn = get_candle_connection()
+    try:
+        with conn:
+            # Série completa (preço, volume e market cap) por moeda e intervalo
+            conn.execute('''CREATE TABLE IF NOT EXISTS candles (
+                                crypto_id TEXT NOT NULL,
+                                interval TEXT NOT NULL,
+                                ts INTEGER NOT NULL,
+                                price REAL NOT NULL,
+                                volume REAL,
+                                market_cap REAL,
+                                PRIMARY KEY (crypto_id, interval, ts)
+                            ) WITHOUT ROWID''')
+
+            # Início do período já baixado por completo para cada série
+            conn.execute('''CREATE TABLE IF NOT EXISTS candle_coverage (
+                                crypto_id TEXT NOT NULL,
+                                interval TEXT NOT NULL,
+                                covered_from INTEGER NOT NULL,
+                                PRIMARY KEY (crypto_id, interval)
+                            )''')
+    finally:
+        conn.close()
+
+
+def interval_for_days(days):
+    return "daily" if days > 1 else "hourly"
+
+
+def _market_chart_rows(crypto_id, interval, market_data):
+    # Alinha preços, volumes e market caps pelo timestamp
+    volumes = {int(ts): value for ts, value in market_data.get("total_volumes", [])}
+    market_caps = {int(ts): value for ts, value in market_data.get("market_caps", [])}
+    return [
+        (crypto_id, interval, int(ts), price, volumes.get(int(ts)), market_caps.get(int(ts)))
+        for ts, price in market_data.get("prices", [])
+        if price is not None
+    ]
+
+
+def get_sync_state(crypto_id, interval):
+    """Retorna (covered_from, último timestamp) da série armazenada"""
+    conn = get_candle_connection()
+    try:
+        row = conn.execute('''SELECT covered_from FROM candle_coverage
+                              WHERE crypto_id = ? AND interval = ?''',
+                           (crypto_id, interval)).fetchone()
+        covered_from = row[0] if row else None
+        row = conn.execute('''SELECT MAX(ts) FROM candles
+                              WHERE crypto_id = ? AND interval = ?''',
+                           (crypto_id, interval)).fetchone()
+        return covered_from, row[0]
+    finally:
+        conn.close()
+
+
+def save_full_window(crypto_id, interval, market_data, covered_from):
+    """Grava uma janela completa baixada da API e registra a cobertura"""
+    rows = _market_chart_rows(crypto_id, interval, market_data)
+    conn = get_candle_connection()
+    try:
+        with conn:
+            conn.execute('''DELETE FROM candles
+                            WHERE crypto_id = ? AND interval = ? AND ts >= ?''',
+                         (crypto_id, interval, covered_from))
+            conn.executemany('''INSERT OR REPLACE INTO candles
+                                (crypto_id, interval, ts, price, volume, market_cap)
+                                VALUES (?, ?, ?, ?, ?, ?)''', rows)
+            conn.execute('''INSERT INTO candle_coverage (crypto_id, interval, covered_from)
+                            VALUES (?, ?, ?)
+                            ON CONFLICT (crypto_id, interval)
+                            DO UPDATE SET covered_from = MIN(covered_from, excluded.covered_from)''',
+                         (crypto_id, interval, covered_from))
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def save_tail(crypto_id, interval, market_data):
+    """Acrescenta o trecho novo da série mantendo um ponto por intervalo.
+
+    Cada intervalo guarda o primeiro ponto recebido nele; o ponto mais recente é
+    provisório e é substituído na próxima sincronização.
+    """
+    step = INTERVAL_MS[interval]
+    rows = sorted(_market_chart_rows(crypto_id, interval, market_data), key=lambda row: row[2])
+
+    conn = get_candle_connection()
+    try:
+        with conn:
+            last_two = conn.execute('''SELECT ts FROM candles
+                                       WHERE crypto_id = ? AND interval = ?
+                                       ORDER BY ts DESC LIMIT 2''',
+                                    (crypto_id, interval)).fetchall()
+
+            # Remover o ponto provisório (mesmo intervalo do ponto anterior)
+            if len(last_two) == 2 and last_two[0][0] // step == last_two[1][0] // step:
+                conn.execute('''DELETE FROM candles
+                                WHERE crypto_id = ? AND interval = ? AND ts = ?''',
+                             (crypto_id, interval, last_two[0][0]))
+                last_ts = last_two[1][0]
+            else:
+                last_ts = last_two[0][0] if last_two else None
+
+            new_rows = []
+            last_bucket = last_ts // step if last_ts is not None else None
+            for index, row in enumerate(rows):
+                ts = row[2]
+                if last_ts is not None and ts <= last_ts:
+                    continue
+                bucket = ts // step
+                if bucket != last_bucket or index == len(rows) - 1:
+                    new_rows.append(row)
+                    last_bucket = bucket
+
+            conn.executemany('''INSERT OR REPLACE INTO candles
+                                (crypto_id, interval, ts, price, volume, market_cap)
+                                VALUES (?, ?, ?, ?, ?, ?)''', new_rows)
+    finally:
+        conn.close()
+    return len(new_rows)
+
+
+def load_candles(crypto_id, interval, since_ms, until_ms=None):
+    """Lê um intervalo da série no mesmo formato do market_chart da CoinGecko"""
+    query = '''SELECT ts, price, volume, market_cap FROM candles
+               WHERE crypto_id = ? AND interval = ? AND ts >= ?'''
+    params = [crypto_id, interval, since_ms]
+    if until_ms is not None:
+        query += " AND ts <= ?"
+        params.append(until_ms)
+    query += " ORDER BY ts"
+
+    conn = get_candle_connection()
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    return {
+        "prices": [[ts, price] for ts, price, _, _ in rows],
+        "total_volumes": [[ts, volume] for ts, _, volume, _ in rows if volume is not None],
+        "market_caps": [[ts, market_cap] for ts, _, _, market_cap in rows if market_cap is not None]
+    }
+
+
+def load_candle_rows(crypto_id, interval, after_ts=None):
+    """Linhas (ts, price, volume, market_cap) da série, opcionalmente após um timestamp"""
+    query = '''SELECT ts, price, volume, market_cap FROM candles
+               WHERE crypto_id = ? AND interval = ?'''
+    params = [crypto_id, interval]
+    if after_ts is not None:
+        query += " AND ts > ?"
+        params.append(after_ts)
+    query += " ORDER BY ts"
+
+    conn = get_candle_connection()
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+
+def save_candle_rows(crypto_id, interval, rows):
+    """Grava linhas (ts, price, volume, market_cap) importadas.
+
+    A cobertura só é estendida quando as linhas encostam no período já coberto,
+    para não esconder lacunas da sincronização.
+    """
+    if not rows:
+        return 0
+    conn = get_candle_connection()
+    try:
+        with conn:
+            conn.executemany('''INSERT OR REPLACE INTO candles
+                                (crypto_id, interval, ts, price, volume, market_cap)
+                                VALUES (?, ?, ?, ?, ?, ?)''',
+                             [(crypto_id, interval, *row) for row in rows])
+            conn.execute('''INSERT INTO candle_coverage (crypto_id, interval, covered_from)
+                            VALUES (?, ?, ?)
+                            ON CONFLICT (crypto_id, interval)
+                            DO UPDATE SET covered_from = MIN(covered_from, excluded.covered_from)
+                            WHERE covered_from <= ?''',
+                         (crypto_id, interval, min(row[0] for row in rows),
+                          max(row[0] for row in rows) + INTERVAL_MS[interval]))
+    finally:
+        conn.close()
+    return len(rows)
@@ -0,0 +1,276 @@
+"""Correlação e covariância móveis entre os retornos das moedas.
+
+Os preços de cada moeda são alinhados em barras de tamanho fixo (último preço
+de cada barra) e os log-retornos da janela ficam em um buffer circular. A média e
+os co-momentos centrados, atualizados pelo método de Welford, permitem atualizar
+as matrizes em O(k²) a cada barra fechada pelos ticks de preço; a passada
+completa sobre a matriz empilhada só é refeita quando moedas, intervalo ou
+janela mudam, ou quando os ticks deixaram de fechar barras.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from price_encoding import price_arrays
+
+# Média e co-momentos são recalculados do buffer a cada N barras para não
+# acumular erro de arredondamento
+RESYNC_INTERVAL = 10_000
+
+# Barras concluídas sem entrar na janela antes de recarregar o histórico
+MAX_STALE_BARS = 2
+
+# Engines mantidos ao mesmo tempo e tempo sem consultas até um deles ser descartado
+MAX_ENGINES = 8
+ENGINE_IDLE_SECONDS = 24 * 3600
+
+
+def bar_closes(prices, step_ms):
+    """Último preço de cada barra de step_ms: (índices das barras, preços)"""
+    timestamps, values = price_arrays(prices)
+    bars = timestamps // step_ms
+    last = np.append(bars[1:] != bars[:-1], True)
+    return bars[last], values[last]
+
+
+def aligned_closes(series, step_ms):
+    """Fechamentos de {crypto_id: market_data} nas barras presentes em todas as séries.
+
+    Retorna (crypto_ids, barras, matriz moedas x barras).
+    """
+    closes = {crypto_id: bar_closes(market_data['prices'], step_ms) for crypto_id, market_data in series.items()}
+    common = functools.reduce(np.intersect1d, (bars for bars, _ in closes.values()))
+    matrix = np.empty((len(closes), len(common)))
+    for row, (bars, values) in enumerate(closes.values()):
+        matrix[row] = values[np.searchsorted(bars, common)]
+    return list(closes), common, matrix
+
+
+class RollingCovariance:
+    """Covariância e correlação de k séries nos últimos `window` retornos"""
+
+    def __init__(self, size, window):
+        self.window = window
+        self.buffer = np.zeros((window, size))  # uma linha por barra, em ordem circular
+        self.position = 0
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.comoments = np.zeros((size, size))  # soma de (x - média)(x - média)ᵀ
+        self.updates = 0
+
+    def reset(self, returns):
+        """Recalcula a janela a partir de uma matriz séries x tempo de retornos"""
+        returns = returns[:, -self.window:]
+        self.count = returns.shape[1]
+        self.buffer[:self.count] = returns.T
+        self.position = self.count % self.window
+        self._resync()
+
+    def _resync(self):
+        window = self.buffer[:self.count]
+        self.mean = window.mean(axis=0) if self.count else np.zeros(window.shape[1])
+        centered = window - self.mean
+        self.comoments = centered.T @ centered
+
+    def update(self, returns):
+        """Inclui os retornos de uma nova barra, descartando a mais antiga se a janela estiver cheia"""
+        if self.count == self.window:
+            oldest = self.buffer[self.position]
+            if self.count == 1:
+                self.count = 0
+                self.mean = np.zeros_like(self.mean)
+                self.comoments = np.zeros_like(self.comoments)
+            else:
+                # Welford ao contrário: retira a barra mais antiga
+                delta = oldest - self.mean
+                self.count -= 1
+                self.mean = self.mean - delta / self.count
+                self.comoments -= np.outer(delta, oldest - self.mean)
+        self.buffer[self.position] = returns
+        self.position = (self.position + 1) % self.window
+        self.count += 1
+        delta = returns - self.mean
+        self.mean = self.mean + delta / self.count
+        self.comoments += np.outer(delta, returns - self.mean)
+
+        self.updates += 1
+        if self.updates % RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def covariance(self):
+        """Covariância amostral (mesmo ddof de np.cov)"""
+        if self.count < 2:
+            return np.full(self.comoments.shape, np.nan)
+        covariance = self.comoments / (self.count - 1)
+        # Simetrizar: as atualizações acumulam arredondamentos diferentes em (i, j) e (j, i)
+        return (covariance + covariance.T) / 2
+
+    def correlation(self):
+        """Correlação de Pearson; séries sem variância ficam com NaN, inclusive na diagonal"""
+        covariance = self.covariance()
+        variance = np.diag(covariance)
+        valid = variance > 0
+        std = np.sqrt(np.where(valid, variance, np.nan))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = np.clip(covariance / np.outer(std, std), -1, 1)
+        np.fill_diagonal(correlation, np.where(valid, 1.0, np.nan))
+        return correlation
+
+
+class CorrelationEngine:
+    """Matrizes móveis das moedas, atualizadas a cada barra fechada pelos ticks de preço"""
+
+    def __init__(self):
+        self.params = None
+        self.crypto_ids = []
+        self.rolling = None
+        self.step_ms = None
+        self.bar = None
+        self.closed_bar = None  # última barra que entrou na janela
+        self.closes = None  # fechamento da última barra que entrou na janela
+        self.current = None  # último preço da barra em andamento
+        self.ticked = None  # moedas com tick na barra em andamento
+        self.updated_at = None
+        self._index = {}
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def configure(self, crypto_ids, step_ms, window, load_series):
+        """Garante o engine com esses parâmetros, refazendo a janela se eles mudaram.
+
+        A janela também é refeita quando mais de MAX_STALE_BARS barras concluídas
+        ficaram de fora (moedas sem ticks). load_series() deve retornar
+        {crypto_id: market_data}; moedas sem dados ficam de fora. Retorna o
+        estado de matrices() lido sob o mesmo lock da configuração.
+        """
+        params = (tuple(crypto_ids), step_ms, window)
+        with self._lock:
+            if self.params == params and not self._stale():
+                return self._state()
+        series = {crypto_id: data for crypto_id, data in load_series().items() if data and data.get('prices')}
+        if not series:
+            raise ValueError("Sem dados de mercado para calcular correlações")
+
+        crypto_ids, bars, matrix = aligned_closes(series, step_ms)
+        if len(bars) < 2:
+            raise ValueError("Histórico alinhado insuficiente para calcular correlações")
+        rolling = RollingCovariance(len(crypto_ids), window)
+        # A última barra ainda está em andamento e só entra na janela quando fechar
+        rolling.reset(np.diff(np.log(matrix[:, :-1]), axis=-1))
+
+        with self._lock:
+            self.params = params
+            self.crypto_ids = crypto_ids
+            self._index = {crypto_id: row for row, crypto_id in enumerate(crypto_ids)}
+            self.rolling = rolling
+            self.step_ms = step_ms
+            self.bar = int(bars[-1])
+            self.closed_bar = int(bars[-2])
+            self.closes = matrix[:, -2].copy()
+            self.current = matrix[:, -1].copy()
+            self.ticked = np.ones(len(crypto_ids), dtype=bool)
+            self.updated_at = time.time()
+            self.rebuilds += 1
+            return self._state()
+
+    def update(self, crypto_id, price, timestamp):
+        """Aplica um tick (timestamp em segundos); ao mudar de barra, fecha a anterior.
+
+        Como em aligned_closes, só entram na janela as barras em que todas as
+        moedas tiveram tick; o retorno da barra seguinte cobre as que ficaram de fora.
+        """
+        with self._lock:
+            row = self._index.get(crypto_id)
+            if row is None:
+                return
+            bar = int(timestamp * 1000) // self.step_ms
+            if bar < self.bar:
+                return
+            if bar > self.bar:
+                if self.ticked.all():
+                    self.rolling.update(np.log(self.current / self.closes))
+                    self.closes = self.current.copy()
+                    self.closed_bar = self.bar
+                self.ticked[:] = False
+                self.bar = bar
+            self.current[row] = price
+            self.ticked[row] = True
+            self.updated_at = time.time()
+
+    def _stale(self):
+        # Barras já concluídas pelo relógio que não entraram na janela
+        now_bar = int(time.time() * 1000) // self.step_ms
+        return now_bar - 1 - self.closed_bar > MAX_STALE_BARS
+
+    def matrices(self):
+        """Estado atual: moedas, número de retornos na janela, covariância e correlação"""
+        with self._lock:
+            if self.rolling is None:
+                return None
+            return self._state()
+
+    def _state(self):
+        return {
+            'crypto_ids': list(self.crypto_ids),
+            'observations': self.rolling.count,
+            'covariance': self.rolling.covariance(),
+            'correlation': self.rolling.correlation(),
+            'updated_at': self.updated_at
+        }
+
+
+class CorrelationEngines:
+    """Um CorrelationEngine por (moedas, intervalo, janela).
+
+    Consultas com parâmetros diferentes não refazem nem leem a janela umas das
+    outras. Cada tick é aplicado a todos os engines; os que ficam sem consultas
+    por idle_seconds (ou excedem max_engines) são descartados.
+    """
+
+    def __init__(self, max_engines=MAX_ENGINES, idle_seconds=ENGINE_IDLE_SECONDS):
+        self.max_engines = max_engines
+        self.idle_seconds = idle_seconds
+        self._engines = OrderedDict()  # parâmetros -> (engine, última consulta)
+        self._lock = threading.Lock()
+
+    def matrices(self, crypto_ids, step_ms, window, load_series):
+        """Estado do engine desses parâmetros, criando ou refazendo a janela se preciso"""
+        key = (tuple(crypto_ids), step_ms, window)
+        with self._lock:
+            self._expire()
+            entry = self._engines.get(key)
+            engine = entry[0] if entry else CorrelationEngine()
+            self._engines[key] = (engine, time.time())
+            self._engines.move_to_end(key)
+            while len(self._engines) > self.max_engines:
+                self._engines.popitem(last=False)
+
+        try:
+            return engine.configure(crypto_ids, step_ms, window, load_series)
+        except Exception:
+            if engine.rolling is None:
+                # Engine que nunca foi configurado não deve pedir ticks
+                with self._lock:
+                    if self._engines.get(key, (None,))[0] is engine:
+                        del self._engines[key]
+            raise
+
+    def update(self, crypto_id, price, timestamp):
+        with self._lock:
+            engines = [engine for engine, _ in self._engines.values()]
+        for engine in engines:
+            engine.update(crypto_id, price, timestamp)
+
+    def crypto_ids(self):
+        """Moedas dos engines ativos, que precisam de ticks para fechar as barras"""
+        with self._lock:
+            self._expire()
+            return {crypto_id for key in self._engines for crypto_id in key[0]}
+
+    def _expire(self):
+        cutoff = time.time() - self.idle_seconds
+        for key in [key for key, (_, used_at) in self._engines.items() if used_at < cutoff]:
+            del self._engines[key]
@@ -3,6 +3,9 @@ axios.defaults.baseURL = 'http://localhost:5000';
 axios.defaults.headers.common['Content-Type'] = 'application/json';
 axios.defaults.withCredentials = true;
 
+// Pontos do gráfico de preços (a série é reduzida no servidor)
+const CHART_POINTS = 500;
+
 // Interceptor para tratar erros
 axios.interceptors.response.use(
     response => response,
@@ -64,7 +67,7 @@ async function analyzeMarket(cryptoId = 'bitcoin', days = 30) {
     try {
         showLoading('market-analysis');
         
-        const response = await axios.get(`http://localhost:5000/analyze?crypto_id=${cryptoId}&days=${days}`);
+        const response = await axios.get(`http://localhost:5000/analyze?crypto_id=${cryptoId}&days=${days}&points=${CHART_POINTS}`);
         
         if (response.status === 200 && response.data) {
             updateMarketAnalysis(response.data);
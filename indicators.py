@@ -0,0 +1,280 @@
+import numpy as np
+
+# Biblioteca de indicadores que retornam a série completa, alinhada ao array de
+# preços de entrada. Posições sem histórico suficiente são preenchidas com NaN.
+# rolling_sum, sma, ema, wilder_ema e rsi também aceitam matrizes com uma série
+# por linha (moedas x tempo) e operam ao longo do último eixo.
+
+HOUR_MS = 3600 * 1000
+DAY_MS = 24 * HOUR_MS
+# Períodos das variações de preço (calculate_price_changes), em ms
+PRICE_CHANGE_PERIODS = {
+    '1h': HOUR_MS,
+    '4h': 4 * HOUR_MS,
+    '24h': DAY_MS,
+    '7d': 7 * DAY_MS,
+    '30d': 30 * DAY_MS,
+    '90d': 90 * DAY_MS,
+    '1y': 365 * DAY_MS
+}
+
+
+def _as_float_array(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def _empty_like(values):
+    return np.full(np.shape(values), np.nan)
+
+
+def rolling_sum(values, period):
+    """Soma móvel em O(n) usando soma acumulada"""
+    values = _as_float_array(values)
+    result = _empty_like(values)
+    if period <= 0 or values.shape[-1] < period:
+        return result
+
+    cumsum = np.cumsum(values, axis=-1)
+    result[..., period - 1] = cumsum[..., period - 1]
+    result[..., period:] = cumsum[..., period:] - cumsum[..., :-period]
+    return result
+
+
+def sma(values, period):
+    """Média móvel simples de toda a série"""
+    return rolling_sum(values, period) / period
+
+
+def rolling_std(values, period):
+    """Desvio padrão populacional móvel (mesmo ddof de np.std)"""
+    values = _as_float_array(values)
+    result = _empty_like(values)
+    if period <= 0 or len(values) < period:
+        return result
+
+    # Centralizar a série reduz o cancelamento numérico em soma/soma dos quadrados
+    centered = values - values.mean()
+    mean = rolling_sum(centered, period) / period
+    mean_sq = rolling_sum(centered * centered, period) / period
+    variance = np.maximum(mean_sq - mean * mean, 0)
+    return np.sqrt(variance)
+
+
+def _rolling_extreme(values, period, accumulate):
+    # Algoritmo de van Herk/Gil-Werman: máximos (ou mínimos) acumulados por bloco,
+    # da esquerda e da direita, combinados em O(n) independentemente da janela
+    values = _as_float_array(values)
+    n = len(values)
+    result = _empty_like(values)
+    if period <= 0 or n < period:
+        return result
+
+    blocks = -(-n // period)
+    fill = -np.inf if accumulate is np.maximum else np.inf
+    padded = np.full(blocks * period, fill)
+    padded[:n] = values
+    padded = padded.reshape(blocks, period)
+
+    prefix = accumulate.accumulate(padded, axis=1).ravel()
+    suffix = accumulate.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    starts = np.arange(n - period + 1)
+    result[period - 1:] = accumulate(suffix[starts], prefix[starts + period - 1])
+    return result
+
+
+def rolling_max(values, period):
+    """Máximo móvel em O(n)"""
+    return _rolling_extreme(values, period, np.maximum)
+
+
+def rolling_min(values, period):
+    """Mínimo móvel em O(n)"""
+    return _rolling_extreme(values, period, np.minimum)
+
+
+def _recursive_smoothing(values, alpha, initial):
+    # Resolve y[t] = (1 - alpha) * y[t-1] + alpha * x[t] em blocos vetorizados.
+    # Dentro de cada bloco a recorrência vira uma soma acumulada ponderada; o
+    # tamanho do bloco é limitado para que (1 - alpha) ** -k não estoure.
+    decay = 1.0 - alpha
+    result = np.empty(np.shape(values))
+    length = result.shape[-1]
+    if length == 0:
+        return result
+    if decay <= 0:
+        result[:] = values
+        return result
+
+    chunk = int(min(4096, max(1, np.floor(200 / -np.log10(decay)))))
+    powers = decay ** np.arange(1, chunk + 1)
+    # Valor anterior de cada série, com eixo final para broadcast sobre o bloco
+    previous = np.asarray(initial, dtype=np.float64)[..., None]
+    for start in range(0, length, chunk):
+        block = values[..., start:start + chunk]
+        size = block.shape[-1]
+        decay_powers = powers[:size]
+        weighted = np.cumsum(alpha * block / decay_powers, axis=-1)
+        result[..., start:start + size] = decay_powers * (previous + weighted)
+        previous = result[..., start + size - 1:start + size]
+    return result
+
+
+def ema(values, period, alpha=None):
+    """EMA recursiva de toda a série, iniciada pela SMA dos primeiros `period` valores"""
+    values = _as_float_array(values)
+    result = _empty_like(values)
+    if period <= 0 or values.shape[-1] < period:
+        return result
+
+    if alpha is None:
+        alpha = 2.0 / (period + 1)
+    seed = values[..., :period].mean(axis=-1)
+    result[..., period - 1] = seed
+    result[..., period:] = _recursive_smoothing(values[..., period:], alpha, seed)
+    return result
+
+
+def wilder_ema(values, period):
+    """Média de Wilder (EMA com alpha = 1/period)"""
+    return ema(values, period, alpha=1.0 / period)
+
+
+def _gains_losses(prices):
+    deltas = np.diff(_as_float_array(prices))
+    gain = np.where(deltas > 0, deltas, 0)
+    loss = np.where(deltas < 0, -deltas, 0)
+    return gain, loss
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    return np.where(avg_loss == 0, np.where(np.isnan(avg_gain), np.nan, 100.0), rsi)
+
+
+def rsi(prices, period=14):
+    """RSI de Wilder para toda a série (último valor equivale a calculate_rsi)"""
+    prices = _as_float_array(prices)
+    result = _empty_like(prices)
+    if prices.shape[-1] <= period:
+        return result
+
+    gain, loss = _gains_losses(prices)
+    result[..., 1:] = _rsi_from_averages(wilder_ema(gain, period), wilder_ema(loss, period))
+    return result
+
+
+def rolling_rsi(prices, period=14):
+    """RSI com médias simples dos últimos `period` deltas em cada barra"""
+    prices = _as_float_array(prices)
+    result = _empty_like(prices)
+    if len(prices) <= period:
+        return result
+
+    gain, loss = _gains_losses(prices)
+    result[1:] = _rsi_from_averages(sma(gain, period), sma(loss, period))
+    return result
+
+
+def macd(prices, fast=12, slow=26, signal=9):
+    """Linha MACD, linha de sinal e histograma para toda a série"""
+    prices = _as_float_array(prices)
+    macd_line = ema(prices, fast) - ema(prices, slow)
+
+    signal_line = _empty_like(prices)
+    valid = slow - 1
+    if len(prices) > valid:
+        signal_line[valid:] = ema(macd_line[valid:], signal)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def bollinger_bands(prices, period=20, num_std=2):
+    """Bandas de Bollinger (superior, média, inferior) para toda a série"""
+    middle = sma(prices, period)
+    width = rolling_std(prices, period) * num_std
+    return middle + width, middle, middle - width
+
+
+def stochastic(prices, period=14):
+    """%K estocástico usando apenas preços de fechamento"""
+    prices = _as_float_array(prices)
+    low_min = rolling_min(prices, period)
+    high_max = rolling_max(prices, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * (prices - low_min) / (high_max - low_min)
+
+
+def lookback_indices(timestamps, offsets, at=None):
+    """Índice do último timestamp <= t - offset, para cada offset (-1 se não houver).
+
+    timestamps em ms, em ordem crescente; `at` são os instantes t (padrão: todos os
+    timestamps). Todos os pares (t, offset) são resolvidos em uma única busca binária,
+    com resultado de forma at.shape + (len(offsets),).
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    at = timestamps if at is None else np.asarray(at, dtype=np.int64)
+    targets = at[..., None] - np.asarray(offsets, dtype=np.int64)
+    return np.searchsorted(timestamps, targets, side='right') - 1
+
+
+def find_pivots(prices, window=20):
+    """Pivôs de suporte (mínimos locais) e resistência (máximos locais) em O(n).
+
+    Um ponto i é pivô quando é o extremo da janela prices[i-window:i+window],
+    o mesmo critério usado por identify_support_resistance.
+    """
+    prices = _as_float_array(prices)
+    n = len(prices)
+    candidates = np.arange(window, n - window)
+    if len(candidates) == 0:
+        empty = np.array([], dtype=np.int64)
+        return {'support_indices': empty, 'support_levels': prices[empty],
+                'resistance_indices': empty, 'resistance_levels': prices[empty]}
+
+    # O extremo da janela [i-window, i+window) termina no índice i+window-1
+    ends = candidates + window - 1
+    window_min = rolling_min(prices, 2 * window)[ends]
+    window_max = rolling_max(prices, 2 * window)[ends]
+
+    support_indices = candidates[prices[candidates] <= window_min]
+    resistance_indices = candidates[prices[candidates] >= window_max]
+    return {
+        'support_indices': support_indices,
+        'support_levels': prices[support_indices],
+        'resistance_indices': resistance_indices,
+        'resistance_levels': prices[resistance_indices]
+    }
+
+
+def cluster_levels(levels, indices, tolerance=0.01):
+    """Agrupa níveis de pivô próximos (distância relativa <= tolerance) em zonas"""
+    levels = _as_float_array(levels)
+    indices = np.asarray(indices)
+    if len(levels) == 0:
+        return []
+
+    order = np.argsort(levels, kind='stable')
+    sorted_levels = levels[order]
+    sorted_indices = indices[order]
+
+    # Nova zona sempre que o salto para o nível anterior excede a tolerância
+    gaps = np.diff(sorted_levels) / sorted_levels[:-1]
+    boundaries = np.flatnonzero(gaps > tolerance) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(sorted_levels)]))
+
+    zones = []
+    for start, end in zip(starts, ends):
+        zone_levels = sorted_levels[start:end]
+        zones.append({
+            'level': float(zone_levels.mean()),
+            'low': float(zone_levels[0]),
+            'high': float(zone_levels[-1]),
+            'touches': int(end - start),
+            'last_index': int(sorted_indices[start:end].max())
+        })
+
+    # Zonas mais tocadas e mais recentes primeiro
+    zones.sort(key=lambda zone: (zone['touches'], zone['last_index']), reverse=True)
+    return zones
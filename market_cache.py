@@ -0,0 +1,249 @@
+import threading
+import time
+from collections import OrderedDict
+
+from candle_store import interval_for_days
+
+DAY_MS = 24 * 3600 * 1000
+
+
+class _InFlight:
+    """Carga em andamento compartilhada pelas threads que pediram a mesma chave"""
+
+    __slots__ = ('event', 'data', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.data = None
+        self.error = None
+
+
+def slice_market_data(data, since_ms):
+    """Recorta uma janela maior de market_chart a partir de since_ms"""
+    return {
+        name: [point for point in series if point[0] >= since_ms]
+        for name, series in data.items()
+        if isinstance(series, list)
+    }
+
+
+class MarketDataCache:
+    """Cache LRU com TTL por chave para janelas de market_chart.
+
+    Thread-safe; falhas simultâneas na mesma chave compartilham uma única carga
+    e janelas menores são servidas recortando uma janela maior já em cache.
+    """
+
+    def __init__(self, max_entries=256, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.sliced = 0
+        self.stale = 0
+
+    @staticmethod
+    def _key(crypto_id, days, interval=None):
+        return (crypto_id, interval or interval_for_days(days), days)
+
+    def _fresh_entry(self, key, now):
+        entry = self._entries.get(key)
+        if entry and now < entry['expires_at']:
+            self._entries.move_to_end(key)
+            return entry
+        return None
+
+    def _covering_entry(self, crypto_id, days, now, interval=None):
+        # Menor janela em cache, do mesmo intervalo, que contém a solicitada
+        interval = interval or interval_for_days(days)
+        best_key = None
+        for key, entry in self._entries.items():
+            if (key[0] == crypto_id and key[1] == interval and key[2] > days
+                    and now < entry['expires_at']
+                    and (best_key is None or key[2] < best_key[2])):
+                best_key = key
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key]
+
+    def _lookup(self, crypto_id, days, now, interval=None):
+        entry = self._fresh_entry(self._key(crypto_id, days, interval), now)
+        if entry:
+            return entry['data']
+
+        entry = self._covering_entry(crypto_id, days, now, interval)
+        if entry:
+            self.sliced += 1
+            return slice_market_data(entry['data'], entry['fetched_at_ms'] - days * DAY_MS)
+        return None
+
+    def put(self, crypto_id, days, data, ttl=None, interval=None):
+        now = time.time()
+        key = self._key(crypto_id, days, interval)
+        with self._lock:
+            self._entries[key] = {
+                'data': data,
+                'fetched_at_ms': int(now * 1000),
+                'expires_at': now + (self.ttl if ttl is None else ttl)
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, crypto_id, days, loader, ttl=None, stale_if=None, interval=None):
+        """Retorna a janela em cache ou executa loader uma única vez por chave.
+
+        Se stale_if() for verdadeiro no momento da falha, a última janela
+        armazenada para a chave é retornada mesmo expirada, sem carregar.
+        interval (padrão: interval_for_days(days)) faz parte da chave.
+        """
+        key = self._key(crypto_id, days, interval)
+        with self._lock:
+            data = self._lookup(crypto_id, days, time.time(), interval)
+            if data is not None:
+                self.hits += 1
+                return data
+
+            self.misses += 1
+            entry = self._entries.get(key)
+            if entry and stale_if is not None and stale_if():
+                self.stale += 1
+                return entry['data']
+
+            flight = self._in_flight.get(key)
+            owner = flight is None
+            if owner:
+                flight = _InFlight()
+                self._in_flight[key] = flight
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.data
+
+        try:
+            flight.data = loader()
+            self.put(crypto_id, days, flight.data, ttl, interval)
+            return flight.data
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced,
+                'sliced': self.sliced,
+                'stale': self.stale
+            }
+
+
+def data_version(market_data):
+    """Identifica o conteúdo de uma janela de market_chart sem percorrê-la"""
+    prices = market_data.get("prices") or []
+    if not prices:
+        return (0,)
+    return (len(prices), prices[0][0], prices[-1][0], prices[-1][1])
+
+
+class AnalysisSnapshotCache:
+    """Análises prontas por (crypto_id, days), válidas enquanto a versão dos dados não muda.
+
+    Cada chave guarda apenas a análise da versão mais recente; análises
+    simultâneas da mesma versão compartilham um único cálculo.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, crypto_id, days, version, compute):
+        """Retorna (análise, instante do cálculo) da versão, calculando-a se necessário"""
+        key = (crypto_id, days)
+        flight_key = (crypto_id, days, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['version'] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry['result'], entry['computed_at']
+
+            self.misses += 1
+            flight = self._in_flight.get(flight_key)
+            owner = flight is None
+            if owner:
+                flight = _InFlight()
+                self._in_flight[flight_key] = flight
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.data
+
+        try:
+            result = compute()
+            computed_at = time.time()
+            flight.data = (result, computed_at)
+            with self._lock:
+                self._entries[key] = {'version': version, 'result': result, 'computed_at': computed_at}
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return flight.data
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(flight_key, None)
+            flight.event.set()
+
+    def invalidate(self, crypto_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == crypto_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced
+            }
@@ -0,0 +1,95 @@
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+
+class CoinGeckoClient:
+    """Cliente HTTP da CoinGecko com conexões reaproveitadas entre requisições.
+
+    Todas as chamadas passam pelo rate limiter compartilhado; base_url pode
+    apontar para um servidor local em testes.
+    """
+
+    def __init__(self, base_url, rate_limiter, admission_timeouts=None,
+                 pool_size=16, timeout=15, max_retries=5, retry_delay=2):
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter
+        self.admission_timeouts = admission_timeouts or {}
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        # Pool de conexões keep-alive: evita um handshake TCP+TLS por chamada
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept': 'application/json'})
+
+    def get_json(self, path, params=None, priority=PRIORITY_INTERACTIVE):
+        deadline = time.time() + self.admission_timeouts.get(priority, 60)
+
+        # Tentar fazer a requisição com retry e backoff exponencial
+        for attempt in range(self.max_retries):
+            # Aguardar um token do bucket global (chamadas interativas têm prioridade)
+            self.rate_limiter.acquire(priority, timeout=max(0, deadline - time.time()))
+            try:
+                response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+
+                if response.status_code == 429:  # Too Many Requests
+                    retry_after = int(response.headers.get('Retry-After', self.retry_delay))
+                    logger.warning(f"Rate limit atingido, bloqueando requisições por {retry_after} segundos...")
+                    self.rate_limiter.penalize(retry_after)
+                    continue
+
+                response.raise_for_status()
+                return response.json()
+
+            except requests.exceptions.RequestException:
+                sleep_time = self.retry_delay * (2 ** attempt)  # Backoff exponencial
+                if attempt < self.max_retries - 1 and time.time() + sleep_time < deadline:
+                    logger.warning(f"Tentativa {attempt + 1} falhou, aguardando {sleep_time}s...")
+                    time.sleep(sleep_time)
+                    continue
+                raise
+
+        raise requests.exceptions.RetryError("Limite de tentativas excedido")
+
+    def market_chart(self, crypto_id, days, interval, priority=PRIORITY_INTERACTIVE):
+        return self.get_json(f"/coins/{crypto_id}/market_chart", {
+            "vs_currency": "usd",
+            "days": days,
+            "interval": interval
+        }, priority)
+
+    def market_chart_range(self, crypto_id, from_seconds, to_seconds, priority=PRIORITY_INTERACTIVE):
+        return self.get_json(f"/coins/{crypto_id}/market_chart/range", {
+            "vs_currency": "usd",
+            "from": from_seconds,
+            "to": to_seconds
+        }, priority)
+
+    def simple_price(self, crypto_ids, priority=PRIORITY_INTERACTIVE):
+        """Preço atual de várias moedas em uma única chamada"""
+        data = self.get_json("/simple/price", {
+            "ids": ",".join(crypto_ids),
+            "vs_currencies": "usd",
+            "include_last_updated_at": "true"
+        }, priority)
+        return {
+            crypto_id: {
+                "price": values["usd"],
+                "last_updated_at": values.get("last_updated_at")
+            }
+            for crypto_id, values in data.items()
+            if "usd" in values
+        }
+
+    def close(self):
+        self.session.close()
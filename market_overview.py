@@ -0,0 +1,144 @@
+"""Visão geral de várias moedas calculada de uma vez sobre matrizes (moedas x tempo).
+
+As séries são cortadas no trecho final que os indicadores usam, empilhadas por
+tamanho e cada indicador roda vetorizado ao longo do último eixo, reproduzindo
+analyze_trend, calculate_rsi e calculate_market_strength de app.py. As variações
+de preço, que podem olhar a série inteira, usam lookback_indices sobre ela toda.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicators import PRICE_CHANGE_PERIODS, lookback_indices, rsi
+from price_encoding import price_arrays
+
+# O peso dos deltas mais antigos no RSI de Wilder decai como (13/14) ** k; após
+# 1000 barras é menor que 1e-30 e o corte não altera o resultado em float64
+RSI_WARMUP_BARS = 1000
+TREND_PERIOD = 14
+RSI_PERIOD = 14
+STOCHASTIC_PERIOD = 14
+# Menor série com MACD (26) e sinal (9) definidos
+MIN_STRENGTH_BARS = 26 + 9 - 1
+
+
+def stack_series(series):
+    """Agrupa {crypto_id: market_data} em matrizes de preços e volumes por tamanho.
+
+    Retorna [(crypto_ids, prices, volumes)], uma entrada por tamanho de série;
+    volumes ausentes ou desalinhados com os preços viram NaN.
+    """
+    groups = {}
+    for crypto_id, market_data in series.items():
+        groups.setdefault(min(len(market_data['prices']), RSI_WARMUP_BARS), []).append(crypto_id)
+
+    stacked = []
+    for length, crypto_ids in groups.items():
+        prices = np.empty((len(crypto_ids), length))
+        volumes = np.full((len(crypto_ids), min(length, 30)), np.nan)
+        for row, crypto_id in enumerate(crypto_ids):
+            market_data = series[crypto_id]
+            prices[row] = price_arrays(market_data['prices'][-length:])[1]
+            coin_volumes = market_data.get('total_volumes') or []
+            if len(coin_volumes) == len(market_data['prices']):
+                volumes[row] = [volume[1] for volume in coin_volumes[-volumes.shape[1]:]]
+        stacked.append((crypto_ids, prices, volumes))
+    return stacked
+
+
+def _weighted_tail(prices, period, count):
+    # Últimos `count` valores de calculate_ema(prices, period) (média com pesos exponenciais)
+    weights = np.exp(np.linspace(-1., 0., period))
+    weights /= weights.sum()
+    windows = sliding_window_view(prices[..., -(period + count - 1):], period, axis=-1)
+    return windows @ weights[::-1]
+
+
+def trend_labels(prices, period=TREND_PERIOD):
+    """Tendência de cada linha pelo preço atual contra a SMA, como analyze_trend"""
+    if prices.shape[-1] < period:
+        return np.full(prices.shape[0], "Indefinida", dtype=object)
+    current = prices[:, -1]
+    sma = prices[:, -period:].mean(axis=-1)
+    return np.select(
+        [current > sma * 1.05, current > sma, current < sma * 0.95, current < sma],
+        ["Forte Alta", "Alta", "Forte Baixa", "Baixa"],
+        default="Lateral"
+    )
+
+
+def macd_last(prices):
+    """Linha MACD e sinal na última barra de cada linha, como calculate_macd"""
+    macd_line = _weighted_tail(prices, 12, 9) - _weighted_tail(prices, 26, 9)
+    signal_line = _weighted_tail(macd_line, 9, 1)[:, -1]
+    return macd_line[:, -1], signal_line
+
+
+def market_strength_scores(prices, volumes, rsi_values):
+    """Componentes e pontuação de calculate_market_strength para cada linha"""
+    macd_line, signal_line = macd_last(prices)
+    low = prices[:, -STOCHASTIC_PERIOD:].min(axis=-1)
+    high = prices[:, -STOCHASTIC_PERIOD:].max(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stochastic = 100 * (prices[:, -1] - low) / (high - low)
+        vol_ratio = volumes[:, -7:].mean(axis=-1) / volumes[:, -30:].mean(axis=-1)
+    price_trend = (prices[:, -1] - prices[:, -20]) / prices[:, -20] * 100
+
+    components = {
+        'rsi_score': 20 * (1 - np.abs(50 - rsi_values) / 50),
+        'macd_score': np.where(macd_line > signal_line, 20, 0),
+        'volume_score': np.minimum(20, 20 * vol_ratio),
+        'trend_score': np.minimum(20, np.maximum(0, price_trend)),
+        'stochastic_score': np.where((stochastic > 20) & (stochastic < 80), 20, 0)
+    }
+    return sum(components.values()), components
+
+
+def price_changes(prices, periods=PRICE_CHANGE_PERIODS):
+    """Variações de calculate_price_changes sobre a lista [[ts, preço], ...]"""
+    timestamps, values = price_arrays(prices)
+    indices = lookback_indices(timestamps, list(periods.values()), at=timestamps[-1])
+    current_price = values[-1]
+    changes = {}
+    for name, index in zip(periods, indices):
+        if index < 0:
+            changes[name] = None
+        else:
+            past = values[index]
+            changes[name] = round(float((current_price - past) / past * 100), 2)
+    return changes
+
+
+def _rounded(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def market_overview(series, symbols):
+    """Tendência, RSI, força do mercado e variações de preço de várias moedas"""
+    overview = {}
+    for crypto_ids, prices, volumes in stack_series(series):
+        length = prices.shape[-1]
+        trends = trend_labels(prices)
+        rsi_values = rsi(prices, RSI_PERIOD)[:, -1]
+        strength = None
+        if length >= MIN_STRENGTH_BARS:
+            strength = market_strength_scores(prices, volumes, rsi_values)
+
+        for row, crypto_id in enumerate(crypto_ids):
+            market_strength = None
+            if strength is not None:
+                score, components = strength
+                if np.isfinite(score[row]):
+                    market_strength = {
+                        'score': round(float(score[row]), 2),
+                        'components': {name: round(float(values[row]), 2)
+                                       for name, values in components.items()}
+                    }
+            overview[crypto_id] = {
+                'symbol': symbols[crypto_id],
+                'current_price': float(prices[row, -1]),
+                'trend': str(trends[row]),
+                'rsi': _rounded(rsi_values[row]),
+                'market_strength': market_strength,
+                'price_changes': price_changes(series[crypto_id]['prices'])
+            }
+    return overview
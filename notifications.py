@@ -0,0 +1,173 @@
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask_mail import Message
+
+logger = logging.getLogger(__name__)
+
+
+def format_alert(alert, current_value, triggered_at):
+    return f"""
+        Criptomoeda: {alert['crypto_id'].upper()}
+        Indicador: {alert['indicator']}
+        Condição: {alert['condition']}
+        Limite: {alert['threshold']}
+        Valor Atual: {current_value}
+
+        Data/Hora: {triggered_at.strftime('%d/%m/%Y %H:%M:%S')}
+        """
+
+
+def build_alert_message(sender, recipient, items):
+    """Monta um e-mail com um ou vários alertas acionados para o mesmo destinatário"""
+    if len(items) == 1:
+        alert, current_value, triggered_at = items[0]
+        subject = f"Alerta de Cripto: {alert['crypto_id'].upper()}"
+        body = "\n        Seu alerta foi acionado!\n        " + format_alert(alert, current_value, triggered_at)
+    else:
+        coins = sorted({alert['crypto_id'].upper() for alert, _, _ in items})
+        subject = f"Alertas de Cripto: {len(items)} alertas ({', '.join(coins)})"
+        body = f"\n        {len(items)} alertas foram acionados!\n        " + "".join(
+            format_alert(alert, current_value, triggered_at)
+            for alert, current_value, triggered_at in items
+        )
+
+    msg = Message(subject, sender=sender, recipients=[recipient])
+    msg.body = body
+    return msg
+
+
+class EmailDispatcher:
+    """Envia e-mails de alerta em segundo plano, sem bloquear o monitor.
+
+    Alertas para o mesmo destinatário dentro de coalesce_window segundos viram
+    um único e-mail; cada lote é enviado por uma única conexão SMTP e, em caso
+    de falha, reenfileirado com backoff exponencial.
+    """
+
+    def __init__(self, app, mail, max_queue_size=1000, coalesce_window=5,
+                 max_retries=5, retry_delay=2):
+        self.app = app
+        self.mail = mail
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._retries = []
+        self._sequence = itertools.count()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="email-dispatcher")
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """Envia o que estiver pendente e encerra a thread"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def enqueue(self, recipient, alert, current_value):
+        """Agenda a notificação; retorna False se a fila estiver cheia"""
+        if not recipient:
+            logger.error("Destinatário de alerta não configurado")
+            return False
+        try:
+            self._queue.put_nowait((recipient, dict(alert), current_value, datetime.now()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.error(f"Fila de e-mails cheia, alerta de {alert['crypto_id']} descartado")
+            return False
+
+    def _collect(self):
+        # Aguarda o primeiro item (ou o próximo reenvio) e junta os que chegarem na janela
+        timeout = 0.5
+        if self._retries:
+            timeout = max(0, min(timeout, self._retries[0][0] - time.time()))
+        try:
+            first = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+
+        items = [first]
+        deadline = time.time() + self.coalesce_window
+        while not self._stopping.is_set():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=min(remaining, 0.5)))
+            except queue.Empty:
+                continue
+
+        # Ao encerrar, incluir tudo que ainda está na fila
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _due_retries(self, flush=False):
+        batches = []
+        now = time.time()
+        while self._retries and (flush or self._retries[0][0] <= now):
+            _, _, attempt, recipient, items = heapq.heappop(self._retries)
+            batches.append((attempt, recipient, items))
+        return batches
+
+    def _run(self):
+        while True:
+            stopping = self._stopping.is_set()
+            batches = [
+                (0, recipient, items)
+                for recipient, items in self._group(self._collect()).items()
+            ]
+            batches.extend(self._due_retries(flush=stopping))
+            if batches:
+                self._send(batches, final=stopping)
+            if stopping and self._queue.empty():
+                return
+
+    @staticmethod
+    def _group(items):
+        grouped = {}
+        for recipient, alert, current_value, triggered_at in items:
+            grouped.setdefault(recipient, []).append((alert, current_value, triggered_at))
+        return grouped
+
+    def _send(self, batches, final=False):
+        sender = self.app.config['MAIL_USERNAME']
+        try:
+            with self.app.app_context():
+                # Uma única conexão SMTP para todos os e-mails do lote
+                with self.mail.connect() as connection:
+                    while batches:
+                        attempt, recipient, items = batches[0]
+                        connection.send(build_alert_message(sender, recipient, items))
+                        batches.pop(0)
+                        self.sent += 1
+                        logger.info(f"E-mail de alerta enviado para {recipient} ({len(items)} alertas)")
+        except Exception as e:
+            logger.error(f"Erro ao enviar e-mail de alerta: {e}")
+            for attempt, recipient, items in batches:
+                self._schedule_retry(attempt + 1, recipient, items, final)
+
+    def _schedule_retry(self, attempt, recipient, items, final):
+        if attempt >= self.max_retries or final:
+            self.failed += len(items)
+            logger.error(f"Desistindo de notificar {recipient} após {attempt} tentativas")
+            return
+        delay = self.retry_delay * (2 ** (attempt - 1))  # Backoff exponencial
+        heapq.heappush(self._retries, (time.time() + delay, next(self._sequence), attempt, recipient, items))
@@ -0,0 +1,180 @@
+"""Arquivo colunar de séries de mercado lido com np.memmap.
+
+Cada série (moeda, intervalo) é guardada como um arquivo binário por campo, com
+dtype fixo, e um index.json com o número de linhas válidas de cada série. Trechos
+de qualquer período são views sem cópia dos arquivos mapeados.
+
+Uso: python price_archive.py export|import [crypto_id ...] [--interval hourly]
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+
+import numpy as np
+
+from candle_store import INTERVAL_MS, init_candle_store, load_candle_rows, save_candle_rows
+
+logger = logging.getLogger(__name__)
+
+PRICE_ARCHIVE_DIR = os.getenv("PRICE_ARCHIVE_DIR", "price_archive")
+
+# Campo, dtype e extensão do arquivo de cada coluna
+FIELDS = (
+    ('ts', np.dtype('<i8'), 'i64'),
+    ('price', np.dtype('<f8'), 'f64'),
+    ('volume', np.dtype('<f8'), 'f64'),
+    ('market_cap', np.dtype('<f8'), 'f64'),
+)
+
+
+class PriceArchive:
+    """Séries de mercado em arquivos colunares, uma pasta por moeda e intervalo"""
+
+    def __init__(self, root=PRICE_ARCHIVE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.root, "index.json")
+
+    def _path(self, crypto_id, interval, field, extension):
+        return os.path.join(self.root, crypto_id, interval, f"{field}.{extension}")
+
+    def index(self):
+        """Resumo das séries arquivadas: {"moeda/intervalo": {length, first_ts, last_ts}}"""
+        try:
+            with open(self._index_path) as index_file:
+                return json.load(index_file)
+        except FileNotFoundError:
+            return {}
+
+    def _save_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        temporary = self._index_path + ".tmp"
+        with open(temporary, "w") as index_file:
+            json.dump(index, index_file, indent=2, sort_keys=True)
+        os.replace(temporary, self._index_path)
+
+    def series(self, crypto_id, interval):
+        """Colunas completas da série como memmaps somente leitura"""
+        entry = self.index().get(f"{crypto_id}/{interval}")
+        length = entry["length"] if entry else 0
+
+        columns = {}
+        for field, dtype, extension in FIELDS:
+            if length:
+                columns[field] = np.memmap(self._path(crypto_id, interval, field, extension),
+                                           dtype=dtype, mode='r', shape=(length,))
+            else:
+                columns[field] = np.empty(0, dtype=dtype)
+        return columns
+
+    def window(self, crypto_id, interval, since_ms=None, until_ms=None):
+        """Trecho [since_ms, until_ms] da série como views sem cópia"""
+        columns = self.series(crypto_id, interval)
+        ts = columns['ts']
+        start = 0 if since_ms is None else int(np.searchsorted(ts, since_ms, side='left'))
+        end = len(ts) if until_ms is None else int(np.searchsorted(ts, until_ms, side='right'))
+        return {field: values[start:end] for field, values in columns.items()}
+
+    def append(self, crypto_id, interval, columns):
+        """Acrescenta linhas posteriores ao fim da série; retorna quantas foram gravadas"""
+        ts = np.asarray(columns['ts'], dtype=np.int64)
+        with self._lock:
+            index = self.index()
+            key = f"{crypto_id}/{interval}"
+            entry = index.get(key, {"length": 0, "first_ts": None, "last_ts": None})
+
+            # Apenas linhas depois do último timestamp arquivado
+            keep = np.ones(len(ts), dtype=bool) if entry["last_ts"] is None else ts > entry["last_ts"]
+            count = int(keep.sum())
+            if not count:
+                return 0
+
+            os.makedirs(os.path.join(self.root, crypto_id, interval), exist_ok=True)
+            for field, dtype, extension in FIELDS:
+                values = np.asarray(columns[field], dtype=dtype)[keep]
+                with open(self._path(crypto_id, interval, field, extension), "ab") as column_file:
+                    # Descartar bytes de uma gravação interrompida que não chegou ao índice
+                    column_file.truncate(entry["length"] * dtype.itemsize)
+                    values.tofile(column_file)
+
+            kept_ts = ts[keep]
+            index[key] = {
+                "length": entry["length"] + count,
+                "first_ts": entry["first_ts"] if entry["first_ts"] is not None else int(kept_ts[0]),
+                "last_ts": int(kept_ts[-1])
+            }
+            # O índice é gravado por último: é ele que define as linhas válidas
+            self._save_index(index)
+            return count
+
+    def export_from_candles(self, crypto_id, interval):
+        """Copia do armazenamento SQLite as linhas ainda não arquivadas.
+
+        O último intervalo armazenado ainda pode mudar na próxima sincronização
+        e fica de fora até ser fechado.
+        """
+        entry = self.index().get(f"{crypto_id}/{interval}")
+        rows = load_candle_rows(crypto_id, interval, entry["last_ts"] if entry else None)
+        if not rows:
+            return 0
+
+        step = INTERVAL_MS[interval]
+        open_bucket = rows[-1][0] // step * step
+        rows = [row for row in rows if row[0] < open_bucket]
+        if not rows:
+            return 0
+
+        # None (volume ou market cap ausente) vira NaN na conversão para float
+        return self.append(crypto_id, interval, {
+            'ts': np.array([row[0] for row in rows], dtype=np.int64),
+            'price': np.array([row[1] for row in rows], dtype=np.float64),
+            'volume': np.array([row[2] for row in rows], dtype=np.float64),
+            'market_cap': np.array([row[3] for row in rows], dtype=np.float64)
+        })
+
+    def import_to_candles(self, crypto_id, interval, since_ms=None):
+        """Grava a série arquivada no armazenamento SQLite"""
+        columns = self.window(crypto_id, interval, since_ms)
+        rows = [
+            (ts, price, None if math.isnan(volume) else volume, None if math.isnan(market_cap) else market_cap)
+            for ts, price, volume, market_cap in zip(
+                columns['ts'].tolist(), columns['price'].tolist(),
+                columns['volume'].tolist(), columns['market_cap'].tolist())
+        ]
+        return save_candle_rows(crypto_id, interval, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta/importa séries entre o SQLite e o arquivo colunar")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("crypto_ids", nargs="*", help="Moedas (na importação, padrão: todas as arquivadas)")
+    parser.add_argument("--interval", default="hourly", choices=sorted(INTERVAL_MS))
+    parser.add_argument("--root", default=PRICE_ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    init_candle_store()
+    archive = PriceArchive(args.root)
+
+    crypto_ids = args.crypto_ids
+    if not crypto_ids and args.command == "import":
+        crypto_ids = sorted({key.split("/")[0] for key in archive.index()})
+    if not crypto_ids:
+        parser.error("informe ao menos uma moeda")
+
+    for crypto_id in crypto_ids:
+        if args.command == "export":
+            count = archive.export_from_candles(crypto_id, args.interval)
+        else:
+            count = archive.import_to_candles(crypto_id, args.interval)
+        logger.info(f"{crypto_id}/{args.interval}: {count} linhas")
+
+
+if __name__ == "__main__":
+    main()
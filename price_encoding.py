@@ -0,0 +1,139 @@
+"""Codificação compacta da série de preços e redução de pontos para gráficos.
+
+Formato colunar: timestamps em deltas inteiros a partir do primeiro timestamp e
+preços como array float32/float64 little-endian, em base64 (dentro do JSON) ou
+como corpo binário (application/octet-stream):
+
+    cabeçalho "<4sBBBxIq": b"CSTP", versão, bytes por delta, bytes por preço, count, primeiro ts
+    deltas   (count - 1) inteiros com sinal
+    preços   count floats
+"""
+import base64
+import itertools
+import struct
+
+import numpy as np
+
+BINARY_MAGIC = b"CSTP"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sBBBxIq")
+
+VALUE_DTYPES = {
+    'float32': np.dtype('<f4'),
+    'float64': np.dtype('<f8')
+}
+
+
+def price_arrays(prices):
+    """Converte a lista [[ts, preço], ...] em arrays (timestamps int64, preços float64)"""
+    count = len(prices)
+    pairs = np.fromiter(itertools.chain.from_iterable(prices), dtype=np.float64, count=2 * count)
+    pairs = pairs.reshape(count, 2)
+    return pairs[:, 0].astype(np.int64), pairs[:, 1]
+
+
+def lttb_indices(x, y, threshold):
+    """Índices dos pontos escolhidos pelo Largest-Triangle-Three-Buckets.
+
+    Mantém o primeiro e o último ponto e, em cada bucket intermediário, o ponto
+    que forma o maior triângulo com o ponto escolhido antes e a média do bucket
+    seguinte, preservando picos e vales visíveis no gráfico.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    # Limites dos buckets intermediários (o primeiro e o último ponto ficam de fora)
+    edges = (np.floor(np.arange(threshold - 1) * every) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+
+    # Média de cada bucket; o "próximo bucket" do último é o ponto final
+    next_x = np.append(np.add.reduceat(x[:n - 1], starts)[1:] / sizes[1:], x[-1])
+    next_y = np.append(np.add.reduceat(y[:n - 1], starts)[1:] / sizes[1:], y[-1])
+
+    # Buckets em uma matriz retangular; o preenchimento repete o primeiro ponto do
+    # bucket, que já é candidato, para não alterar o argmax
+    columns = np.arange(sizes.max())
+    positions = starts[:, None] + np.where(columns < sizes[:, None], columns, 0)
+    bucket_x = x[positions]
+    bucket_y = y[positions]
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    chosen = 0
+    for bucket in range(threshold - 2):
+        # Área do triângulo (ponto escolhido, candidato, média seguinte) como a*y + b*x + c
+        chosen_x = x[chosen]
+        chosen_y = y[chosen]
+        a = chosen_x - next_x[bucket]
+        b = next_y[bucket] - chosen_y
+        c = -a * chosen_y - b * chosen_x
+        area = np.abs(a * bucket_y[bucket] + b * bucket_x[bucket] + c)
+        chosen = positions[bucket, int(area.argmax())]
+        indices[bucket + 1] = chosen
+    return indices
+
+
+def downsample(timestamps, values, points):
+    """Reduz a série para `points` pontos com LTTB (sem alteração se já for menor)"""
+    if not points or points >= len(timestamps):
+        return timestamps, values
+    indices = lttb_indices(timestamps, values, points)
+    return timestamps[indices], values[indices]
+
+
+def _delta_dtype(deltas):
+    if not len(deltas) or (deltas.min() >= np.iinfo(np.int32).min and deltas.max() <= np.iinfo(np.int32).max):
+        return np.dtype('<i4')
+    return np.dtype('<i8')
+
+
+def encode_columnar(timestamps, values, value_dtype='float64'):
+    """Série em deltas + array de preços, ambos em base64, para embutir no JSON"""
+    dtype = VALUE_DTYPES[value_dtype]
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    deltas = np.diff(timestamps)
+    delta_dtype = _delta_dtype(deltas)
+    return {
+        "encoding": "columnar",
+        "count": len(timestamps),
+        "start": int(timestamps[0]) if len(timestamps) else None,
+        "ts_deltas": base64.b64encode(deltas.astype(delta_dtype).tobytes()).decode("ascii"),
+        "ts_dtype": "int32" if delta_dtype.itemsize == 4 else "int64",
+        "values": base64.b64encode(np.asarray(values, dtype=dtype).tobytes()).decode("ascii"),
+        "dtype": value_dtype
+    }
+
+
+def encode_binary(timestamps, values, value_dtype='float64'):
+    """Mesmo conteúdo de encode_columnar como corpo binário"""
+    dtype = VALUE_DTYPES[value_dtype]
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    deltas = np.diff(timestamps)
+    delta_dtype = _delta_dtype(deltas)
+    header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, delta_dtype.itemsize, dtype.itemsize,
+                                len(timestamps), int(timestamps[0]) if len(timestamps) else 0)
+    return header + deltas.astype(delta_dtype).tobytes() + np.asarray(values, dtype=dtype).tobytes()
+
+
+def decode_binary(body):
+    """Inverso de encode_binary: retorna (timestamps int64, preços)"""
+    magic, version, delta_size, value_size, count, start = BINARY_HEADER.unpack_from(body)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Formato binário de preços desconhecido")
+    offset = BINARY_HEADER.size
+    deltas = np.frombuffer(body, dtype=f'<i{delta_size}', count=max(count - 1, 0), offset=offset)
+    offset += deltas.nbytes
+    values = np.frombuffer(body, dtype=f'<f{value_size}', count=count, offset=offset)
+    timestamps = np.empty(count, dtype=np.int64)
+    if count:
+        timestamps[0] = start
+        np.cumsum(deltas, dtype=np.int64, out=timestamps[1:])
+        timestamps[1:] += start
+    return timestamps, values
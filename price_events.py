@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+PriceUpdate = namedtuple('PriceUpdate', ['crypto_id', 'price', 'timestamp'])
+
+
+class PriceEventBus:
+    """Barramento em processo que distribui atualizações de preço aos assinantes.
+
+    Apenas preços que mudaram desde a última publicação da moeda são enviados, e
+    só se o timestamp for mais novo que o dela: a sincronização do gráfico e o
+    polling de cotações publicam a mesma moeda e não podem alternar preços antigos.
+    """
+
+    def __init__(self, max_queue_size=1000):
+        self.max_queue_size = max_queue_size
+        self._subscribers = []
+        self._last_prices = {}
+        self._last_timestamps = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def publish(self, crypto_id, price, timestamp=None):
+        """Publica o preço se ele mudou e é mais novo; retorna True quando publicado"""
+        timestamp = timestamp or time.time()
+        with self._lock:
+            if timestamp <= self._last_timestamps.get(crypto_id, 0):
+                return False
+            self._last_timestamps[crypto_id] = timestamp
+            if self._last_prices.get(crypto_id) == price:
+                return False
+            self._last_prices[crypto_id] = price
+            subscribers = list(self._subscribers)
+
+        update = PriceUpdate(crypto_id, price, timestamp)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(update)
+            except queue.Full:
+                logger.warning(f"Fila de eventos cheia, atualização de {crypto_id} descartada")
+        return True
+
+
+def drain_latest(subscriber, timeout=None):
+    """Aguarda um evento e retorna o mais recente de cada moeda já enfileirado"""
+    try:
+        update = subscriber.get(timeout=timeout)
+    except queue.Empty:
+        return {}
+
+    latest = {update.crypto_id: update}
+    while True:
+        try:
+            update = subscriber.get_nowait()
+        except queue.Empty:
+            return latest
+        latest[update.crypto_id] = update
+
+
+class AdaptivePollScheduler:
+    """Intervalo de consulta por moeda proporcional à sua movimentação recente.
+
+    Moedas que se movem mais que target_move por consulta são consultadas com
+    mais frequência (até min_interval); moedas paradas, até max_interval.
+    """
+
+    def __init__(self, base_interval=60, min_interval=5, max_interval=300,
+                 target_move=0.002, smoothing=0.3):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_move = target_move
+        self.smoothing = smoothing
+        self._last_prices = {}
+        self._moves = {}
+        self._next_due = {}
+        self._wakeup = threading.Event()
+
+    def record(self, crypto_id, price, now=None):
+        now = time.time() if now is None else now
+        last_price = self._last_prices.get(crypto_id)
+        self._last_prices[crypto_id] = price
+
+        move = self._moves.get(crypto_id, self.target_move)
+        if last_price:
+            change = abs(price - last_price) / last_price
+            move = (1 - self.smoothing) * move + self.smoothing * change
+        self._moves[crypto_id] = move
+
+        interval = self.max_interval if move <= 0 else self.base_interval * self.target_move / move
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        self._next_due[crypto_id] = now + interval
+        return interval
+
+    def postpone(self, crypto_ids, delay, now=None):
+        now = time.time() if now is None else now
+        for crypto_id in crypto_ids:
+            self._next_due[crypto_id] = now + delay
+
+    def due(self, crypto_ids, now=None):
+        now = time.time() if now is None else now
+        return [crypto_id for crypto_id in crypto_ids if self._next_due.get(crypto_id, 0) <= now]
+
+    def seconds_until_next(self, crypto_ids, now=None):
+        now = time.time() if now is None else now
+        if not crypto_ids:
+            return self.max_interval
+        next_due = min(self._next_due.get(crypto_id, 0) for crypto_id in crypto_ids)
+        return min(self.max_interval, max(0, next_due - now))
+
+    def wait(self, timeout):
+        """Dorme até o timeout ou até wake() ser chamado"""
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def wake(self):
+        self._wakeup.set()
@@ -0,0 +1,202 @@
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Camada agregada: tabela, duração do candle em segundos e retenção em dias
+# (None mantém indefinidamente)
+Tier = namedtuple('Tier', ['name', 'table', 'seconds', 'retention_days'])
+
+TIERS = (
+    Tier('1m', 'price_ohlc_1m', 60, 7),
+    Tier('1h', 'price_ohlc_1h', 3600, 365),
+    Tier('1d', 'price_ohlc_1d', 86400, None),
+)
+
+# Maior período (em dias) atendido por cada camada, como a granularidade da CoinGecko
+TIER_MAX_DAYS = {'1m': 1, '1h': 90}
+
+DAY_SECONDS = 86400
+
+
+def _aggregate(ticks, seconds):
+    """Agrupa ticks (crypto_id, ts, price), em ordem de ts, em candles OHLC"""
+    candles = {}
+    for crypto_id, ts, price in ticks:
+        key = (crypto_id, ts - ts % seconds)
+        candle = candles.get(key)
+        if candle is None:
+            candles[key] = [price, price, price, price, 1]
+        else:
+            if price > candle[1]:
+                candle[1] = price
+            if price < candle[2]:
+                candle[2] = price
+            candle[3] = price
+            candle[4] += 1
+    return [(crypto_id, bucket, *values) for (crypto_id, bucket), values in candles.items()]
+
+
+class PriceRetention:
+    """Consolida o price_history em candles de 1 minuto, 1 hora e 1 dia.
+
+    Cada rollup lê apenas os ticks novos (pelo id) e os mescla nas três camadas
+    com upsert. Ticks já consolidados e mais antigos que raw_retention_days são
+    apagados em lotes pequenos, cada um em sua própria transação.
+
+    As camadas ficam em tier_database, que persiste entre execuções como o
+    armazenamento de candles; o price_history e o id já consolidado ficam em
+    database, que pode ser recriado a cada inicialização.
+    """
+
+    def __init__(self, database, tier_database=None, raw_retention_days=2, prune_batch_size=5000,
+                 tiers=TIERS):
+        self.database = database
+        self.tier_database = tier_database or database
+        self.raw_retention_days = raw_retention_days
+        self.prune_batch_size = prune_batch_size
+        self.tiers = tiers
+
+    def init_schema(self):
+        with self.tier_database.connect() as conn:
+            for tier in self.tiers:
+                conn.execute(f'''CREATE TABLE IF NOT EXISTS {tier.table} (
+                                    crypto_id TEXT NOT NULL,
+                                    bucket INTEGER NOT NULL,
+                                    open REAL NOT NULL,
+                                    high REAL NOT NULL,
+                                    low REAL NOT NULL,
+                                    close REAL NOT NULL,
+                                    samples INTEGER NOT NULL,
+                                    PRIMARY KEY (crypto_id, bucket)
+                                ) WITHOUT ROWID''')
+
+        # Último id do price_history já consolidado, no mesmo banco que ele
+        with self.database.connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS price_rollup_state (
+                                id INTEGER PRIMARY KEY CHECK (id = 1),
+                                last_raw_id INTEGER NOT NULL
+                            )''')
+            conn.execute('''INSERT OR IGNORE INTO price_rollup_state (id, last_raw_id)
+                            VALUES (1, 0)''')
+
+    def rollup(self, max_rows=50000):
+        """Consolida os ticks novos nas camadas agregadas; retorna quantos foram lidos"""
+        with self.database.connect() as conn:
+            last_raw_id = conn.execute(
+                "SELECT last_raw_id FROM price_rollup_state WHERE id = 1").fetchone()[0]
+            rows = conn.execute('''SELECT id, crypto_id, CAST(strftime('%s', timestamp) AS INTEGER), price
+                                   FROM price_history
+                                   WHERE id > ?
+                                   ORDER BY id
+                                   LIMIT ?''', (last_raw_id, max_rows)).fetchall()
+        if not rows:
+            return 0
+
+        ticks = sorted(((row[1], row[2], row[3]) for row in rows if row[2] is not None),
+                       key=lambda tick: tick[1])
+        with self.tier_database.connect() as conn:
+            for tier in self.tiers:
+                conn.executemany(f'''INSERT INTO {tier.table}
+                                     (crypto_id, bucket, open, high, low, close, samples)
+                                     VALUES (?, ?, ?, ?, ?, ?, ?)
+                                     ON CONFLICT (crypto_id, bucket) DO UPDATE SET
+                                         high = MAX(high, excluded.high),
+                                         low = MIN(low, excluded.low),
+                                         close = excluded.close,
+                                         samples = samples + excluded.samples''',
+                                 _aggregate(ticks, tier.seconds))
+
+        # Os bancos são separados: uma falha entre as duas transações faz o lote
+        # ser mesclado de novo, o que só afeta a contagem de amostras
+        with self.database.connect() as conn:
+            conn.execute("UPDATE price_rollup_state SET last_raw_id = ? WHERE id = 1",
+                         (rows[-1][0],))
+        return len(rows)
+
+    def prune(self, now=None):
+        """Apaga ticks consolidados e candles fora da retenção; retorna linhas apagadas"""
+        conn = self.database.connect()
+        deleted = 0
+        try:
+            last_raw_id = conn.execute(
+                "SELECT last_raw_id FROM price_rollup_state WHERE id = 1").fetchone()[0]
+            now_clause = "'now'" if now is None else f"{int(now)}, 'unixepoch'"
+
+            # Lotes curtos, cada um na sua transação, para não segurar o lock de
+            # escrita por muito tempo (o bloco with devolveria a conexão ao pool)
+            while True:
+                cursor = conn.execute(f'''DELETE FROM price_history WHERE id IN (
+                                              SELECT id FROM price_history
+                                              WHERE id <= ?
+                                                AND timestamp < datetime({now_clause}, ?)
+                                              ORDER BY id
+                                              LIMIT ?)''',
+                                      (last_raw_id, f"-{self.raw_retention_days} days",
+                                       self.prune_batch_size))
+                conn.commit()
+                deleted += cursor.rowcount
+                if cursor.rowcount < self.prune_batch_size:
+                    break
+        finally:
+            conn.close()
+
+        conn = self.tier_database.connect()
+        try:
+            for tier in self.tiers:
+                if tier.retention_days is None:
+                    continue
+                cutoff = self._now(conn, now) - tier.retention_days * DAY_SECONDS
+                crypto_ids = [row[0] for row in conn.execute(
+                    f"SELECT DISTINCT crypto_id FROM {tier.table}")]
+                for crypto_id in crypto_ids:
+                    cursor = conn.execute(f'''DELETE FROM {tier.table}
+                                              WHERE crypto_id = ? AND bucket < ?''',
+                                          (crypto_id, cutoff))
+                    conn.commit()
+                    deleted += cursor.rowcount
+        finally:
+            conn.close()
+        return deleted
+
+    @staticmethod
+    def _now(conn, now):
+        if now is not None:
+            return int(now)
+        return conn.execute("SELECT CAST(strftime('%s', 'now') AS INTEGER)").fetchone()[0]
+
+    def run_maintenance(self):
+        """Consolida todo o atraso pendente e aplica a retenção"""
+        rolled = 0
+        while True:
+            count = self.rollup()
+            rolled += count
+            if not count:
+                break
+        pruned = self.prune()
+        if rolled or pruned:
+            logger.info(f"Histórico de preços: {rolled} ticks consolidados, {pruned} linhas apagadas")
+        return rolled, pruned
+
+    def tier_for_days(self, days):
+        """Camada mais fina que cobre o período pedido, respeitando TIER_MAX_DAYS"""
+        for tier in self.tiers:
+            max_days = TIER_MAX_DAYS.get(tier.name)
+            covers = tier.retention_days is None or tier.retention_days >= days
+            if covers and (max_days is None or days <= max_days):
+                return tier
+        return self.tiers[-1]
+
+    def load_history(self, crypto_id, days, now=None):
+        """Candles OHLC do período, lidos da camada adequada ao número de dias"""
+        tier = self.tier_for_days(days)
+        conn = self.tier_database.connect()
+        try:
+            since = self._now(conn, now) - int(days * DAY_SECONDS)
+            rows = conn.execute(f'''SELECT bucket, open, high, low, close, samples
+                                    FROM {tier.table}
+                                    WHERE crypto_id = ? AND bucket >= ?
+                                    ORDER BY bucket''', (crypto_id, since - since % tier.seconds)).fetchall()
+        finally:
+            conn.close()
+        return tier, [tuple(row) for row in rows]
@@ -0,0 +1,86 @@
+import heapq
+import itertools
+import threading
+import time
+
+# Prioridades de admissão: valores menores são atendidos primeiro
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class RateLimitTimeout(Exception):
+    """Admissão não obtida dentro do tempo máximo de espera"""
+
+
+class TokenBucketLimiter:
+    """Token bucket global compartilhado entre threads, com fila por prioridade.
+
+    As threads aguardam em ordem de (prioridade, chegada); um 429 com
+    Retry-After bloqueia o bucket para todas elas até o instante indicado.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)  # tokens por segundo
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def _wait_time(self, now, queued_ahead):
+        # Tempo até existir um token para este chamador e todos à sua frente
+        missing = queued_ahead + 1 - self._tokens
+        wait = max(0.0, missing / self.rate)
+        return max(wait, self._blocked_until - now)
+
+    def estimate_wait(self, priority=PRIORITY_INTERACTIVE):
+        """Estimativa, em segundos, até uma nova chamada com esta prioridade ser admitida"""
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            queued_ahead = sum(1 for waiter in self._waiters if waiter[0] <= priority)
+            return self._wait_time(now, queued_ahead)
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """Bloqueia até obter um token; levanta RateLimitTimeout se exceder timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == ticket and now >= self._blocked_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+
+                    wait = self._wait_time(now, 0) if self._waiters[0] == ticket else None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            raise RateLimitTimeout("Tempo de espera do rate limit excedido")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def penalize(self, retry_after):
+        """Aplica um Retry-After recebido da API a todas as threads"""
+        with self._condition:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            self._tokens = 0.0
+            self._updated_at = now
+            self._condition.notify_all()
@@ -0,0 +1,109 @@
+"""Serialização JSON rápida, compressão e ETag para as respostas da API.
+
+Usa orjson (e brotli) quando instalados; sem eles, cai para o json da biblioteca
+padrão e gzip. Escalares e arrays NumPy são serializados diretamente.
+"""
+import gzip
+import hashlib
+import json
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+# Respostas menores que isto não compensam o custo da compressão
+COMPRESSION_MIN_SIZE = 1024
+# Nível 1 já reduz a série de preços a ~40% em um terço do tempo do nível 5
+GZIP_LEVEL = 1
+BROTLI_QUALITY = 4
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Objeto do tipo {type(value).__name__} não é serializável em JSON")
+
+
+def dumps_bytes(obj):
+    """Serializa para JSON compacto com chaves ordenadas (como o jsonify padrão)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS
+                            | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, default=_default, sort_keys=True, separators=(",", ":")) + "\n").encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provider do Flask que usa dumps_bytes em jsonify e nas respostas em dict/list"""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            kwargs.setdefault("default", _default)
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def version_etag(*parts):
+    """ETag fraca derivada da versão dos dados e dos parâmetros da resposta"""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+
+
+def not_modified(request, etag):
+    """True se o cliente já tem a representação identificada por etag"""
+    return request.if_none_match.contains_weak(etag)
+
+
+def _choose_encoding(accept_encodings):
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def finalize_response(request, response):
+    """Adiciona ETag às respostas GET, responde 304 quando possível e comprime o corpo"""
+    if response.direct_passthrough or response.status_code != 200:
+        return response
+
+    if request.method == "GET":
+        etag, _ = response.get_etag()
+        if etag is None:
+            etag = hashlib.blake2b(response.get_data(), digest_size=12).hexdigest()
+            response.set_etag(etag, weak=True)
+        if not_modified(request, etag):
+            response.status_code = 304
+            response.set_data(b"")
+            return response
+
+    if "Content-Encoding" in response.headers:
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+
+    encoding = _choose_encoding(request.accept_encodings)
+    if encoding == "br":
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+    elif encoding == "gzip":
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    else:
+        return response
+    response.headers["Content-Encoding"] = encoding
+    return response
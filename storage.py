@@ -0,0 +1,230 @@
+import logging
+import queue
+import sqlite3
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Nenhuma conexão do pool ficou livre dentro do tempo máximo de espera"""
+
+
+class PooledConnection:
+    """Conexão emprestada do pool; close() devolve a conexão em vez de fechá-la.
+
+    Como context manager, confirma a transação ao sair do bloco (ou a desfaz em
+    caso de exceção) e devolve a conexão ao pool.
+    """
+
+    __slots__ = ('_database', '_conn')
+
+    def __init__(self, database, conn):
+        self._database = database
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Conexão já devolvida ao pool")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self._conn is not None:
+                self._conn.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.close()
+        return False
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._database.release(conn)
+
+
+class Database:
+    """Gerenciador de conexões SQLite em modo WAL com pool de conexões reaproveitadas.
+
+    Reaproveitar a conexão também reaproveita os statements já preparados pelo
+    cache interno do módulo sqlite3.
+    """
+
+    def __init__(self, path, pool_size=8, pooled=True, wal=True, synchronous="NORMAL",
+                 cached_statements=256, row_factory=sqlite3.Row, acquire_timeout=30):
+        self.path = path
+        self.pool_size = pool_size
+        self.acquire_timeout = acquire_timeout
+        self.pooled = pooled
+        self.wal = wal
+        self.synchronous = synchronous
+        self.cached_statements = cached_statements
+        self.row_factory = row_factory
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.row_factory = self.row_factory
+        if self.wal:
+            # WAL permite leituras concorrentes com a escrita
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def connect(self):
+        """Retorna uma conexão do pool (ou uma nova, se o pool estiver desativado).
+
+        Com o pool esgotado, espera até acquire_timeout segundos pela devolução
+        de uma conexão e levanta PoolTimeout se nenhuma ficar livre.
+        """
+        if not self.pooled:
+            return PooledConnection(self, self._create())
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._create()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                # Pool esgotado: aguardar a devolução de uma conexão
+                try:
+                    conn = self._idle.get(timeout=self.acquire_timeout)
+                except queue.Empty:
+                    raise PoolTimeout(
+                        f"Nenhuma conexão livre em {self.acquire_timeout}s ({self.pool_size} em uso)"
+                    ) from None
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        if not self.pooled:
+            conn.close()
+            return
+        try:
+            # Descartar transação deixada aberta por quem devolveu a conexão
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao devolver conexão ao pool: {e}")
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def close_all(self):
+        """Fecha as conexões ociosas (por exemplo, antes de remover o arquivo)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+class WriteBehindBuffer:
+    """Buffer circular em memória gravado em lote por uma thread de fundo.
+
+    As linhas são gravadas a cada batch_size linhas ou a cada flush_interval
+    segundos, o que ocorrer primeiro, com um único executemany por lote. Com o
+    buffer cheio as linhas mais antigas são descartadas, limitando a memória.
+    Um lote que falhou volta ao buffer apenas no espaço livre, descartando as
+    suas linhas mais antigas.
+    """
+
+    def __init__(self, database, insert_sql, batch_size=500, flush_interval=0.5, capacity=100_000):
+        self.database = database
+        self.insert_sql = insert_sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, daemon=True, name="write-behind")
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """Grava as linhas pendentes e encerra a thread"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def append(self, row):
+        with self._condition:
+            if len(self._rows) == self._rows.maxlen:
+                self.dropped += 1
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_size:
+                self._condition.notify_all()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def flush(self):
+        """Grava imediatamente tudo que estiver no buffer"""
+        with self._flush_lock:
+            with self._condition:
+                rows = list(self._rows)
+                self._rows.clear()
+            if not rows:
+                return 0
+
+            try:
+                with self.database.connect() as conn:
+                    conn.executemany(self.insert_sql, rows)
+            except Exception as e:
+                logger.error(f"Erro ao gravar lote de {len(rows)} linhas: {e}")
+                self._requeue(rows)
+                return 0
+            self.written += len(rows)
+            return len(rows)
+
+    def _requeue(self, rows):
+        # Devolver o lote ao início do buffer para a próxima tentativa. As linhas
+        # que chegaram durante a gravação são mais novas e têm prioridade; do
+        # lote, ficam só as mais recentes que couberem no espaço livre
+        with self._condition:
+            room = self._rows.maxlen - len(self._rows)
+            lost = max(0, len(rows) - room)
+            if lost:
+                self.dropped += lost
+                logger.warning(f"Buffer cheio: {lost} linhas do lote com falha descartadas")
+            self._rows.extendleft(reversed(rows[lost:]))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._rows) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
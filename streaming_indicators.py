@@ -0,0 +1,393 @@
+"""Indicadores incrementais atualizados a cada novo preço em O(1).
+
+Cada classe guarda apenas o estado mínimo (médias de Wilder, EMAs, somas móveis,
+deques monotônicos) e produz os mesmos valores que a versão vetorizada de
+indicators.py aplicada à série inteira. O estado pode ser salvo com snapshot()
+e recriado com restore().
+
+CoinIndicators recebe ticks e só avança os indicadores quando uma barra fecha;
+o último preço da barra em andamento é aplicado de forma provisória em values().
+"""
+import json
+import math
+import os
+import threading
+from collections import deque
+
+# Somas móveis são recalculadas da janela a cada N atualizações para não
+# acumular erro de arredondamento
+RESYNC_INTERVAL = 10_000
+
+# Barra padrão dos indicadores por moeda: uma hora, a granularidade da série
+# de 1 dia (market_chart horário) usada para iniciá-los e pela análise
+BAR_SECONDS = 3600
+
+_registry = {}
+
+
+def _register(cls):
+    _registry[cls.__name__] = cls
+    return cls
+
+
+class _Streaming:
+    __slots__ = ()
+
+    def snapshot(self):
+        state = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, _Streaming):
+                value = value.snapshot()
+            elif isinstance(value, deque):
+                value = {"items": list(value), "maxlen": value.maxlen}
+            state[name] = value
+        return {"type": type(self).__name__, "state": state}
+
+    def clone(self):
+        """Cópia independente do estado, mais barata que copy.deepcopy"""
+        cls = type(self)
+        instance = cls.__new__(cls)
+        for name in cls.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, _Streaming):
+                value = value.clone()
+            elif isinstance(value, deque):
+                value = deque(value, maxlen=value.maxlen)
+            setattr(instance, name, value)
+        return instance
+
+    @staticmethod
+    def restore(snapshot):
+        cls = _registry[snapshot["type"]]
+        if set(snapshot["state"]) != set(cls.__slots__):
+            raise ValueError(f"Snapshot de {cls.__name__} com campos diferentes dos atuais")
+        instance = cls.__new__(cls)
+        for name, value in snapshot["state"].items():
+            if isinstance(value, dict) and "type" in value:
+                value = _Streaming.restore(value)
+            elif isinstance(value, dict) and "items" in value:
+                items = (tuple(item) if isinstance(item, list) else item for item in value["items"])
+                value = deque(items, maxlen=value["maxlen"])
+            setattr(instance, name, value)
+        return instance
+
+
+@_register
+class RollingWindow(_Streaming):
+    """Últimos `period` valores com soma e soma dos quadrados móveis"""
+
+    __slots__ = ('period', 'window', 'total', 'total_sq', 'updates')
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.updates = 0
+
+    def update(self, value):
+        if len(self.window) == self.period:
+            oldest = self.window[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.window.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+        self.updates += 1
+        if self.updates % RESYNC_INTERVAL == 0:
+            self.total = math.fsum(self.window)
+            self.total_sq = math.fsum(item * item for item in self.window)
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+    @property
+    def mean(self):
+        return self.total / self.period if self.ready else math.nan
+
+    @property
+    def std(self):
+        """Desvio padrão populacional (mesmo ddof de np.std)"""
+        if not self.ready:
+            return math.nan
+        mean = self.total / self.period
+        return math.sqrt(max(self.total_sq / self.period - mean * mean, 0.0))
+
+
+@_register
+class StreamingSMA(_Streaming):
+    __slots__ = ('rolling',)
+
+    def __init__(self, period):
+        self.rolling = RollingWindow(period)
+
+    def update(self, price):
+        self.rolling.update(price)
+        return self.value
+
+    @property
+    def value(self):
+        return self.rolling.mean
+
+
+@_register
+class StreamingEMA(_Streaming):
+    """EMA iniciada pela SMA dos primeiros `period` valores, como indicators.ema"""
+
+    __slots__ = ('period', 'alpha', 'count', 'seed_total', 'value')
+
+    def __init__(self, period, alpha=None):
+        self.period = period
+        self.alpha = 2.0 / (period + 1) if alpha is None else alpha
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = math.nan
+
+    def update(self, price):
+        self.count += 1
+        if self.count < self.period:
+            self.seed_total += price
+        elif self.count == self.period:
+            self.value = (self.seed_total + price) / self.period
+        else:
+            self.value += self.alpha * (price - self.value)
+        return self.value
+
+
+@_register
+class StreamingRSI(_Streaming):
+    """RSI de Wilder, equivalente a indicators.rsi e calculate_rsi"""
+
+    __slots__ = ('period', 'last_price', 'avg_gain', 'avg_loss')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.last_price = None
+        self.avg_gain = StreamingEMA(period, alpha=1.0 / period)
+        self.avg_loss = StreamingEMA(period, alpha=1.0 / period)
+
+    def update(self, price):
+        if self.last_price is not None:
+            delta = price - self.last_price
+            self.avg_gain.update(delta if delta > 0 else 0.0)
+            self.avg_loss.update(-delta if delta < 0 else 0.0)
+        self.last_price = price
+        return self.value
+
+    @property
+    def value(self):
+        avg_gain = self.avg_gain.value
+        avg_loss = self.avg_loss.value
+        if math.isnan(avg_gain):
+            return math.nan
+        if avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+@_register
+class StreamingMACD(_Streaming):
+    __slots__ = ('fast', 'slow', 'signal')
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, price):
+        self.fast.update(price)
+        self.slow.update(price)
+        line = self.line
+        if not math.isnan(line):
+            self.signal.update(line)
+        return line, self.signal.value
+
+    @property
+    def line(self):
+        return self.fast.value - self.slow.value
+
+    @property
+    def histogram(self):
+        return self.line - self.signal.value
+
+
+@_register
+class StreamingBollinger(_Streaming):
+    __slots__ = ('num_std', 'rolling')
+
+    def __init__(self, period=20, num_std=2):
+        self.num_std = num_std
+        self.rolling = RollingWindow(period)
+
+    def update(self, price):
+        self.rolling.update(price)
+        return self.bands
+
+    @property
+    def bands(self):
+        """(superior, média, inferior)"""
+        middle = self.rolling.mean
+        width = self.rolling.std * self.num_std
+        return middle + width, middle, middle - width
+
+
+@_register
+class StreamingStochastic(_Streaming):
+    """%K com mínimo e máximo da janela mantidos em deques monotônicos"""
+
+    __slots__ = ('period', 'index', 'last_price', 'minimums', 'maximums')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.index = -1
+        self.last_price = math.nan
+        self.minimums = deque()  # (índice, preço) com preços crescentes
+        self.maximums = deque()  # (índice, preço) com preços decrescentes
+
+    def update(self, price):
+        self.index += 1
+        self.last_price = price
+        while self.minimums and self.minimums[-1][1] >= price:
+            self.minimums.pop()
+        self.minimums.append((self.index, price))
+        while self.maximums and self.maximums[-1][1] <= price:
+            self.maximums.pop()
+        self.maximums.append((self.index, price))
+
+        expired = self.index - self.period
+        if self.minimums[0][0] <= expired:
+            self.minimums.popleft()
+        if self.maximums[0][0] <= expired:
+            self.maximums.popleft()
+        return self.value
+
+    @property
+    def value(self):
+        if self.index < self.period - 1:
+            return math.nan
+        low = self.minimums[0][1]
+        high = self.maximums[0][1]
+        if high == low:
+            return math.nan
+        return 100 * (self.last_price - low) / (high - low)
+
+
+@_register
+class CoinIndicators(_Streaming):
+    """Conjunto de indicadores incrementais de uma moeda, avançados por barra fechada"""
+
+    __slots__ = ('bar_seconds', 'bar', 'pending', 'last_price', 'rsi', 'macd', 'sma_20', 'bollinger',
+                 'stochastic')
+
+    def __init__(self, bar_seconds=BAR_SECONDS):
+        self.bar_seconds = bar_seconds
+        self.bar = None  # barra em andamento
+        self.pending = None  # último preço da barra em andamento
+        self.last_price = math.nan  # fechamento da última barra concluída
+        self.rsi = StreamingRSI(14)
+        self.macd = StreamingMACD(12, 26, 9)
+        self.sma_20 = StreamingSMA(20)
+        self.bollinger = StreamingBollinger(20, 2)
+        self.stochastic = StreamingStochastic(14)
+
+    def update(self, price, timestamp):
+        """Aplica um tick (timestamp em segundos); ao mudar de barra, fecha a anterior.
+
+        Retorna False para ticks de uma barra já fechada, que são ignorados.
+        """
+        bar = int(timestamp // self.bar_seconds)
+        if self.bar is not None:
+            if bar < self.bar:
+                return False
+            if bar > self.bar:
+                self._close(self.pending)
+        self.bar = bar
+        self.pending = float(price)
+        return True
+
+    def _close(self, price):
+        self.last_price = price
+        self.rsi.update(price)
+        self.macd.update(price)
+        self.sma_20.update(price)
+        self.bollinger.update(price)
+        self.stochastic.update(price)
+
+    def extend(self, points):
+        """Aplica uma série [(timestamp em segundos, preço), ...] em ordem"""
+        for timestamp, price in points:
+            self.update(price, timestamp)
+
+    def values(self):
+        """Valores atuais, com a barra em andamento fechada no último preço"""
+        state = self
+        if self.pending is not None:
+            # A barra em andamento entra numa cópia; o estado só avança quando ela fechar
+            state = self.clone()
+            state._close(self.pending)
+        upper, middle, lower = state.bollinger.bands
+        return {
+            "price": state.last_price,
+            "rsi": state.rsi.value,
+            "macd": state.macd.line,
+            "macd_signal": state.macd.signal.value,
+            "sma_20": state.sma_20.value,
+            "bollinger_upper": upper,
+            "bollinger_middle": middle,
+            "bollinger_lower": lower,
+            "stochastic": state.stochastic.value
+        }
+
+
+class IndicatorStates:
+    """Indicadores incrementais por moeda, com snapshot em disco.
+
+    Todas as moedas usam barras de bar_seconds, que deve ser a granularidade da
+    série passada a seed().
+    """
+
+    def __init__(self, bar_seconds=BAR_SECONDS):
+        self.bar_seconds = bar_seconds
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def get(self, crypto_id):
+        return self._states.get(crypto_id)
+
+    def seed(self, crypto_id, points):
+        """Recria o estado da moeda a partir de uma série [(timestamp em segundos, preço), ...]"""
+        state = CoinIndicators(self.bar_seconds)
+        state.extend(points)
+        with self._lock:
+            self._states[crypto_id] = state
+        return state
+
+    def update(self, crypto_id, price, timestamp):
+        """Aplica um tick; retorna None se a moeda ainda não foi iniciada"""
+        with self._lock:
+            state = self._states.get(crypto_id)
+            if state is not None:
+                state.update(price, timestamp)
+        return state
+
+    def save(self, path):
+        with self._lock:
+            data = {crypto_id: state.snapshot() for crypto_id, state in self._states.items()}
+        temporary = path + ".tmp"
+        with open(temporary, "w") as snapshot_file:
+            json.dump(data, snapshot_file)
+        os.replace(temporary, path)
+
+    def load(self, path):
+        with open(path) as snapshot_file:
+            data = json.load(snapshot_file)
+        states = {crypto_id: _Streaming.restore(snapshot) for crypto_id, snapshot in data.items()}
+        # Estados salvos com outra largura de barra são refeitos no próximo tick
+        states = {crypto_id: state for crypto_id, state in states.items()
+                  if state.bar_seconds == self.bar_seconds}
+        with self._lock:
+            self._states = states
+        return len(states)